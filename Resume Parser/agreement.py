@@ -0,0 +1,251 @@
+import argparse
+import difflib
+import json
+import logging
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+import gpt
+import metrics
+import transport
+from extraction import UnreadableResumeError, extract_text_from_bytes, shutdown_extraction_pool
+from preprocess import compact_resume_text, split_sections
+
+# Logging Configuration
+logger = logging.getLogger(__name__)
+
+# Agreement Evaluation Configuration
+LABELS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Resume Scoring.xlsx")
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resume_repository")
+SCORE_TOLERANCE = 1  # Scores within this many points agree, as in the sheet's Precision columns
+NAME_MATCH_THRESHOLD = 0.8  # Similarity of a candidate's name to the start of a file name needed to pair them
+
+SHEET_NAMESPACE = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+# Sheet columns: candidate name, criterion, weight and the manual score
+COLUMNS = {"C": "candidate", "D": "criterion", "E": "weight", "F": "manual"}
+
+def read_sheet_rows(path):
+    """Rows of the first worksheet of an .xlsx file as {column letter: value}."""
+    with zipfile.ZipFile(path) as workbook:
+        shared_strings = []
+        if "xl/sharedStrings.xml" in workbook.namelist():
+            shared_strings = [
+                "".join(text.text or "" for text in item.iter(f"{SHEET_NAMESPACE}t"))
+                for item in ET.fromstring(workbook.read("xl/sharedStrings.xml")).iter(f"{SHEET_NAMESPACE}si")
+            ]
+        sheet = ET.fromstring(workbook.read("xl/worksheets/sheet1.xml"))
+
+    for row in sheet.iter(f"{SHEET_NAMESPACE}row"):
+        values = {}
+        for cell in row.iter(f"{SHEET_NAMESPACE}c"):
+            value = cell.find(f"{SHEET_NAMESPACE}v")
+            if value is None:
+                continue
+            column = re.match(r"[A-Z]+", cell.get("r")).group()
+            values[column] = shared_strings[int(value.text)] if cell.get("t") == "s" else value.text
+        yield values
+
+def load_labeled_set(path=LABELS_PATH):
+    """
+    Manual scores from the scoring sheet: {candidate: {criterion: {"weight": ..., "manual": ...}}}.
+    Each candidate's name is on the first row of its block of criteria.
+    """
+    labeled = {}
+    candidate = None
+    for row in read_sheet_rows(path):
+        values = {name: row[column].strip() for column, name in COLUMNS.items() if row.get(column, "").strip()}
+        if "candidate" in values:
+            candidate = values["candidate"]
+        if candidate is None or not {"criterion", "weight", "manual"} <= values.keys():
+            continue
+        try:
+            labeled.setdefault(candidate, {})[values["criterion"]] = {
+                "weight": float(values["weight"]),
+                "manual": float(values["manual"])
+            }
+        except ValueError:  # The header row
+            continue
+    return labeled
+
+def normalize_name(text):
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+def match_resume_file(candidate, file_names):
+    """
+    File in file_names holding the candidate's resume, or None. A roll number in
+    parentheses ("Name (22B2499)") is matched exactly, otherwise the name is
+    compared with the start of each file name.
+    """
+    roll_number = re.search(r"\(([^)]+)\)", candidate)
+    if roll_number:
+        matches = [name for name in file_names if normalize_name(roll_number.group(1)) in normalize_name(name)]
+        return matches[0] if matches else None
+
+    name = normalize_name(candidate)
+    best, best_ratio = None, 0.0
+    for file_name in file_names:
+        stem = normalize_name(os.path.splitext(file_name)[0])
+        ratio = difflib.SequenceMatcher(None, name, stem[:len(name)]).ratio()
+        if ratio > best_ratio:
+            best, best_ratio = file_name, ratio
+    return best if best_ratio >= NAME_MATCH_THRESHOLD else None
+
+def agrees(score, other):
+    return abs(score - other) <= SCORE_TOLERANCE
+
+def cascade_choice(fast, strong, minimum_confidence):
+    """What the cascade would return: the fast tier's answer when it is confident enough, otherwise the strong tier's."""
+    confident = fast.get("confidence") is not None and fast["confidence"] >= minimum_confidence
+    return (fast if confident else strong), not confident
+
+class AgreementStats:
+    """Running agreement counts for one score or answer comparison."""
+
+    def __init__(self):
+        self.total = 0
+        self.agreed = 0
+        self.absolute_error = 0.0
+
+    def record(self, value, reference):
+        self.total += 1
+        if isinstance(value, bool):
+            self.agreed += int(value == reference)
+        else:
+            self.agreed += int(agrees(value, reference))
+            self.absolute_error += abs(value - reference)
+
+    def report(self, with_error=True):
+        if not self.total:
+            return None
+        report = {"pairs": self.total, "agreement": round(self.agreed / self.total, 3)}
+        if with_error:
+            report["mean_absolute_error"] = round(self.absolute_error / self.total, 3)
+        return report
+
+def evaluate_candidate(resume_text, criteria):
+    """
+    Qualify and score one resume with both tiers.
+    Returns ({tier: qualification}, {tier: scores}, {tier: cost in USD}).
+    """
+    sections = split_sections(compact_resume_text(resume_text)) if gpt.PREPROCESS_ENABLED else None
+    qualification_text = gpt.route_resume_text(resume_text, sections, gpt.QUALIFICATION_SECTIONS)
+    weights = {criterion: labels["weight"] for criterion, labels in criteria.items()}
+    scoring_text = gpt.route_resume_text(resume_text, sections, gpt.combined_sections(weights))
+
+    qualifications, scores, costs = {}, {}, {}
+    for tier, model in (("fast", gpt.FAST_MODEL), ("strong", gpt.GPT_MODEL)):
+        with metrics.track_resume() as usage:
+            qualified, _, confidence = gpt.ask_qualification(qualification_text, model)
+            qualifications[tier] = {"qualified": qualified, "confidence": confidence}
+            scores[tier] = gpt.score_all_criteria(scoring_text, weights, model)
+        costs[tier] = usage.cost_usd
+    return qualifications, scores, costs
+
+def run_agreement(labels_path=LABELS_PATH, corpus_dir=CORPUS_DIR):
+    """
+    Score every labeled resume with the fast and the strong model and measure
+    how often the fast tier, and the cascade built on it, agree with the strong
+    model and with the manual scores. Returns the report dict.
+    """
+    labeled = load_labeled_set(labels_path)
+    file_names = sorted(os.listdir(corpus_dir))
+    stats = {
+        name: AgreementStats() for name in (
+            "fast_vs_manual", "strong_vs_manual", "cascade_vs_manual", "fast_vs_strong", "cascade_vs_strong",
+            "qualification_fast_vs_strong", "qualification_cascade_vs_strong"
+        )
+    }
+    escalations = {"qualification": 0, "evaluation": 0}
+    costs = {"fast": 0.0, "strong": 0.0}
+    candidates = []
+    skipped = {}
+
+    for candidate, criteria in labeled.items():
+        file_name = match_resume_file(candidate, file_names)
+        if file_name is None:
+            skipped[candidate] = "No matching resume file"
+            continue
+        try:
+            with open(os.path.join(corpus_dir, file_name), "rb") as f:
+                resume_text = extract_text_from_bytes(f.read(), file_name)
+            qualifications, scores, candidate_costs = evaluate_candidate(resume_text, criteria)
+        except UnreadableResumeError as e:
+            skipped[candidate] = f"Unreadable: {e}"
+            continue
+        except Exception as e:
+            logger.error(f"Error evaluating {candidate} ({file_name}): {e}")
+            skipped[candidate] = str(e)
+            continue
+
+        for tier, cost in candidate_costs.items():
+            costs[tier] += cost
+        strong_qualified = qualifications["strong"]["qualified"]
+        cascade_qualification, escalated = cascade_choice(qualifications["fast"], qualifications["strong"], gpt.QUALIFICATION_MIN_CONFIDENCE)
+        escalations["qualification"] += int(escalated)
+        stats["qualification_fast_vs_strong"].record(qualifications["fast"]["qualified"], strong_qualified)
+        stats["qualification_cascade_vs_strong"].record(cascade_qualification["qualified"], strong_qualified)
+
+        rows = {}
+        for criterion, labels in criteria.items():
+            fast, strong = scores["fast"][criterion], scores["strong"][criterion]
+            cascade, escalated = cascade_choice(fast, strong, gpt.SCORE_MIN_CONFIDENCE)
+            escalations["evaluation"] += int(escalated)
+            stats["fast_vs_manual"].record(fast["score"], labels["manual"])
+            stats["strong_vs_manual"].record(strong["score"], labels["manual"])
+            stats["cascade_vs_manual"].record(cascade["score"], labels["manual"])
+            stats["fast_vs_strong"].record(fast["score"], strong["score"])
+            stats["cascade_vs_strong"].record(cascade["score"], strong["score"])
+            rows[criterion] = {
+                "manual": labels["manual"],
+                "fast": fast["score"],
+                "fast_confidence": fast.get("confidence"),
+                "strong": strong["score"],
+                "escalated": escalated
+            }
+        candidates.append({
+            "candidate": candidate,
+            "file": file_name,
+            "qualification": qualifications,
+            "scores": rows
+        })
+
+    return {
+        "models": {"fast": gpt.FAST_MODEL, "strong": gpt.GPT_MODEL},
+        "thresholds": {
+            "qualification_min_confidence": gpt.QUALIFICATION_MIN_CONFIDENCE,
+            "score_min_confidence": gpt.SCORE_MIN_CONFIDENCE,
+            "score_tolerance": SCORE_TOLERANCE
+        },
+        "candidates_evaluated": len(candidates),
+        "skipped": skipped,
+        "agreement": {
+            name: stat.report(with_error=not name.startswith("qualification")) for name, stat in stats.items()
+        },
+        "escalation_rate": {
+            "qualification": round(escalations["qualification"] / len(candidates), 3) if candidates else None,
+            "evaluation": round(escalations["evaluation"] / stats["fast_vs_strong"].total, 3) if stats["fast_vs_strong"].total else None
+        },
+        "cost_usd": {tier: round(cost, 6) for tier, cost in costs.items()},
+        "candidates": candidates
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how well the fast model tier and the cascade agree with the strong model and with manual scores.")
+    parser.add_argument("--labels", default=LABELS_PATH, help="Scoring sheet with manual scores per candidate and criterion")
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="Directory holding the labeled resumes")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    try:
+        report = run_agreement(args.labels, args.corpus)
+    finally:
+        transport.close_clients()
+        shutdown_extraction_pool()
+    print(json.dumps({name: value for name, value in report.items() if name != "candidates"}, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import argparse
+import json
+import logging
+import gpt
+import metrics
+import transport
+from cache import make_key
+from extraction import UnreadableResumeError, extract_text_from_bytes
+from preprocess import compact_resume_text, split_sections
+
+# Logging Configuration
+logger = logging.getLogger(__name__)
+
+# Batch Configuration
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+
+def make_custom_id(resume_key, kind, criterion=None):
+    """Stable request ID: the same resume, request kind and criterion always give the same ID."""
+    return f"{kind}-{make_key(resume_key, kind, criterion)[:32]}"
+
+def _write_request(requests_file, custom_id, body):
+    line = {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+    requests_file.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+def prepare_batch(bucket_name, resume_keys, requests_path, manifest_path):
+    """
+    Download and extract every resume and write all of its qualification and
+    evaluation prompts to requests_path in the OpenAI Batch format. Evaluation
+    prompts are written up front for every resume that the local pre-screen
+    did not reject, since there is no second round trip in a batch.
+    manifest_path records, per resume, the text and the custom IDs needed by
+    ingest_batch(). Returns the number of requests written.
+    """
+    count = 0
+    criteria_weights = gpt.get_criteria_weights()
+
+    with open(requests_path, "w", encoding="utf-8") as requests_file, \
+            open(manifest_path, "w", encoding="utf-8") as manifest_file:
+        for resume_key in resume_keys:
+            entry = {"resume_key": resume_key, "requests": {}}
+            try:
+                resume_text = extract_text_from_bytes(gpt.download_resume_to_memory(bucket_name, resume_key), resume_key)
+            except UnreadableResumeError as e:
+                entry["unreadable"] = str(e)
+                manifest_file.write(json.dumps(entry) + "\n")
+                continue
+            except Exception as e:
+                logger.error(f"Error preparing resume {resume_key}: {e}")
+                entry["error"] = str(e)
+                manifest_file.write(json.dumps(entry) + "\n")
+                continue
+
+            entry["resume_text"] = resume_text
+            sections = split_sections(compact_resume_text(resume_text)) if gpt.PREPROCESS_ENABLED else None
+
+            local = gpt.prescreen_qualification(resume_text) if gpt.PRESCREEN_ENABLED else None
+            if local is not None:
+                entry["qualification"] = list(local)
+            else:
+                custom_id = make_custom_id(resume_key, "qualification")
+                qualification_text = gpt.route_resume_text(resume_text, sections, gpt.QUALIFICATION_SECTIONS)
+                _write_request(requests_file, custom_id, gpt.build_qualification_request(qualification_text))
+                entry["requests"]["qualification"] = custom_id
+                count += 1
+
+            if local is None or local[0]:
+                entry["criteria_versions"] = gpt.criteria_registry.versions(criteria_weights)
+                if gpt.EVALUATION_MODE == "combined":
+                    custom_id = make_custom_id(resume_key, "evaluation")
+                    combined_text = gpt.route_resume_text(resume_text, sections, gpt.combined_sections(criteria_weights))
+                    blocks = [gpt.build_criterion_block(criterion, weight) for criterion, weight in criteria_weights.items()]
+                    _write_request(requests_file, custom_id, gpt.build_combined_evaluation_request(combined_text, blocks))
+                    entry["requests"]["evaluation"] = custom_id
+                    count += 1
+                else:
+                    for criterion, weight in criteria_weights.items():
+                        custom_id = make_custom_id(resume_key, "evaluation", criterion)
+                        criterion_text = gpt.route_resume_text(resume_text, sections, gpt.criteria_registry.sections(criterion))
+                        _write_request(requests_file, custom_id, gpt.build_evaluation_request(criterion_text, criterion, weight))
+                        entry["requests"][criterion] = custom_id
+                        count += 1
+
+            manifest_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    logger.info(f"Wrote {count} batch requests to {requests_path}")
+    return count
+
+def submit_batch(requests_path):
+    """Upload a request file and start an OpenAI batch. Returns the batch ID."""
+    client = transport.get_openai_client()
+    with open(requests_path, "rb") as f:
+        batch_file = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=COMPLETION_WINDOW
+    )
+    logger.info(f"Submitted batch {batch.id} ({requests_path})")
+    return batch.id
+
+def download_batch_responses(batch_id, responses_path):
+    """
+    Save the output of a finished batch, failed requests included, to responses_path.
+    Returns the batch status; nothing is written until it is "completed".
+    """
+    client = transport.get_openai_client()
+    batch = client.batches.retrieve(batch_id)
+    if batch.status != "completed":
+        return batch.status
+
+    with open(responses_path, "wb") as f:
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                f.write(client.files.content(file_id).content)
+    return batch.status
+
+def run_batch_locally(requests_path, responses_path):
+    """
+    Local stand-in for the Batch API: send each request in requests_path through
+    the shared OpenAI client (which may point at a local server via
+    transport.configure(openai_base_url=...)) and write a response file in the
+    same format the Batch API produces.
+    """
+    with open(requests_path, encoding="utf-8") as requests_file, \
+            open(responses_path, "w", encoding="utf-8") as responses_file:
+        for line in requests_file:
+            request = json.loads(line)
+            output = {"id": f"local-{request['custom_id']}", "custom_id": request["custom_id"], "response": None, "error": None}
+            try:
+                completion = gpt.create_chat_completion(request["body"])
+                output["response"] = {"status_code": 200, "body": completion.model_dump()}
+            except Exception as e:
+                output["error"] = {"code": type(e).__name__, "message": str(e)}
+            responses_file.write(json.dumps(output, ensure_ascii=False) + "\n")
+
+def load_batch_responses(responses_path):
+    """Map custom_id to message content, or to an Exception for failed requests."""
+    responses = {}
+    with open(responses_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            output = json.loads(line)
+            response = output.get("response") or {}
+            if output.get("error") or response.get("status_code") != 200:
+                error = output.get("error") or response.get("body", {}).get("error")
+                responses[output["custom_id"]] = RuntimeError(f"Batch request failed: {error}")
+            else:
+                responses[output["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+    return responses
+
+def summarize_batch_usage(responses_path):
+    """Prompt (and prompt-cached) and completion tokens over the successful responses in a batch response file."""
+    summary = {"calls": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0}
+    with open(responses_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            usage = ((json.loads(line).get("response") or {}).get("body") or {}).get("usage")
+            if not usage:
+                continue
+            summary["calls"] += 1
+            summary["prompt_tokens"] += usage.get("prompt_tokens") or 0
+            summary["cached_prompt_tokens"] += (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+            summary["completion_tokens"] += usage.get("completion_tokens") or 0
+    summary["prompt_cache_hit_rate"] = metrics.cache_hit_rate(summary["cached_prompt_tokens"], summary["prompt_tokens"])
+    return summary
+
+def _response(responses, custom_id):
+    content = responses.get(custom_id, RuntimeError(f"No batch response for {custom_id}"))
+    if isinstance(content, Exception):
+        raise content
+    return content
+
+def build_result(entry, responses):
+    """Rebuild the result dict process_resume() would have returned for one manifest entry."""
+    resume_key = entry["resume_key"]
+    if "error" in entry:
+        return {"resume_key": resume_key, "error": entry["error"]}
+    if "unreadable" in entry:
+        return {"resume_key": resume_key, "status": "Unreadable", "reason": entry["unreadable"]}
+
+    try:
+        if "qualification" in entry:
+            qualified, qualification_details = entry["qualification"]
+        else:
+            qualification_details = _response(responses, entry["requests"]["qualification"])
+            qualified = gpt.parse_qualification(qualification_details)
+
+        if not qualified:
+            return {
+                "resume_key": resume_key,
+                "status": "Not Qualified",
+                "qualification_details": qualification_details
+            }
+
+        criteria_weights = gpt.get_criteria_weights()
+        evaluations = {}
+        if "evaluation" in entry["requests"]:
+            scores = gpt.parse_criteria_scores(_response(responses, entry["requests"]["evaluation"]), criteria_weights)
+            missing = sorted(set(criteria_weights) - set(scores))
+            if missing:
+                raise ValueError(f"GPT evaluation did not score criteria: {missing}")
+            for criterion in criteria_weights:
+                evaluations[criterion] = gpt.format_evaluation(scores[criterion])
+        else:
+            for criterion in criteria_weights:
+                evaluations[criterion] = _response(responses, entry["requests"][criterion])
+
+        return {
+            "resume_key": resume_key,
+            "status": "Qualified",
+            "qualification_details": qualification_details,
+            "evaluations": evaluations,
+            "criteria_versions": entry.get("criteria_versions", {}),
+            "resume_text": entry["resume_text"]
+        }
+    except Exception as e:
+        logger.error(f"Error processing resume {resume_key}: {e}")
+        return {"resume_key": resume_key, "error": str(e)}
+
+def ingest_batch(responses_path, manifest_path):
+    """Rebuild per-resume result dicts, in manifest order, from a batch response file."""
+    responses = load_batch_responses(responses_path)
+    with open(manifest_path, encoding="utf-8") as f:
+        return [build_result(json.loads(line), responses) for line in f if line.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline batch scoring of an S3 resume folder.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    prepare = subparsers.add_parser("prepare", help="Write the request file and manifest for a folder")
+    prepare.add_argument("--bucket", default="hm-video-audio-bucket")
+    prepare.add_argument("--folder", required=True)
+    prepare.add_argument("--requests", default="batch_requests.jsonl")
+    prepare.add_argument("--manifest", default="batch_manifest.jsonl")
+
+    submit = subparsers.add_parser("submit", help="Upload a request file and start a batch")
+    submit.add_argument("--requests", default="batch_requests.jsonl")
+
+    download = subparsers.add_parser("download", help="Save the responses of a finished batch")
+    download.add_argument("--batch-id", required=True)
+    download.add_argument("--responses", default="batch_responses.jsonl")
+
+    run_local = subparsers.add_parser("run-local", help="Answer a request file with direct API calls")
+    run_local.add_argument("--requests", default="batch_requests.jsonl")
+    run_local.add_argument("--responses", default="batch_responses.jsonl")
+
+    ingest = subparsers.add_parser("ingest", help="Build results.json from a response file")
+    ingest.add_argument("--responses", default="batch_responses.jsonl")
+    ingest.add_argument("--manifest", default="batch_manifest.jsonl")
+    ingest.add_argument("--output", default="results.json")
+
+    args = parser.parse_args()
+    try:
+        if args.command == "prepare":
+            count = prepare_batch(args.bucket, gpt.iter_files_in_folder(args.bucket, args.folder), args.requests, args.manifest)
+            print(f"{count} requests written to {args.requests}")
+        elif args.command == "submit":
+            print(submit_batch(args.requests))
+        elif args.command == "download":
+            print(f"Batch status: {download_batch_responses(args.batch_id, args.responses)}")
+        elif args.command == "run-local":
+            run_batch_locally(args.requests, args.responses)
+        else:
+            results = ingest_batch(args.responses, args.manifest)
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"{len(results)} results saved to {args.output}")
+            print(f"Batch usage: {json.dumps(summarize_batch_usage(args.responses))}")
+    finally:
+        transport.close_clients()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import re
+import resource
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+import cache
+import dedup
+import extraction
+import gpt
+import metrics
+import ratelimit
+import transport
+from cascade import CascadeStats
+from speculation import AUTO, OFF, ON, SpeculationPolicy
+
+# Logging Configuration
+logger = logging.getLogger(__name__)
+
+# Benchmark Configuration
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resume_repository")
+CORPUS_EXTENSIONS = extraction.SUPPORTED_EXTENSIONS
+BENCHMARK_BUCKET = "benchmark-bucket"
+BENCHMARK_FOLDER = "resumes/"
+LIST_PAGE_SIZE = 1000  # S3's own maximum keys per ListObjectsV2 page
+MOCK_CACHE_MIN_TOKENS = 1024  # Shortest prompt prefix the API caches
+MOCK_CACHE_BLOCK_TOKENS = 128  # Cached prefixes grow in steps of this many tokens
+MOCK_MODEL_LIMIT_FACTORS = {gpt.FAST_MODEL: 5}  # Per-model budgets as multiples of --mock-*-per-minute, as the fast tier gets higher limits
+
+class MockS3Handler(BaseHTTPRequestHandler):
+    """
+    Path-style S3 stand-in for ListObjectsV2 and GetObject, serving the files
+    of server.corpus ({key: path}) from a single bucket.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        bucket, _, key = url.path.lstrip("/").partition("/")
+        key = urllib.parse.unquote(key)
+        query = urllib.parse.parse_qs(url.query)
+        if bucket != self.server.bucket:
+            self._send(404, b"<Error><Code>NoSuchBucket</Code></Error>")
+        elif not key and query.get("list-type") == ["2"]:
+            self._send(200, self._list_objects(query).encode())
+        elif key in self.server.corpus:
+            with open(self.server.corpus[key], "rb") as f:
+                self._send(200, f.read(), "application/octet-stream")
+        else:
+            self._send(404, b"<Error><Code>NoSuchKey</Code></Error>")
+
+    def _list_objects(self, query):
+        prefix = query.get("prefix", [""])[0]
+        max_keys = min(int(query.get("max-keys", [LIST_PAGE_SIZE])[0]), self.server.page_size)
+        start = query.get("continuation-token", [""])[0]
+        keys = sorted(key for key in self.server.corpus if key.startswith(prefix) and key > start)
+        page, truncated = keys[:max_keys], len(keys) > max_keys
+        contents = "".join(
+            f"<Contents><Key>{escape(key)}</Key><Size>{os.path.getsize(self.server.corpus[key])}</Size></Contents>"
+            for key in page
+        )
+        next_token = f"<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>" if truncated else ""
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f"<Name>{escape(self.server.bucket)}</Name><Prefix>{escape(prefix)}</Prefix>"
+            f"<KeyCount>{len(page)}</KeyCount><MaxKeys>{max_keys}</MaxKeys>"
+            f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>{next_token}{contents}"
+            "</ListBucketResult>"
+        )
+
+    def _send(self, status, body, content_type="application/xml"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """
+    OpenAI-compatible /chat/completions stand-in. Each call waits latency
+    plus or minus jitter seconds, and a share of calls (rate_limit_rate) is
+    answered with 429 so the client's retry path is exercised. With
+    requests/tokens per minute set, calls over their model's budget also get a
+    429 and every response carries that model's x-ratelimit-* headers like the real API. Requests
+    asking for logprobs (the cascade's fast tier) get per-token logprobs, and
+    prompts sharing a long prefix with an earlier one report cached tokens.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        prompt_tokens = sum(len(message["content"]) for message in body["messages"]) // 4
+        cached_tokens = server.cached_prompt_tokens(body)
+        admitted, headers = server.admit(body["model"], prompt_tokens)
+        time.sleep(max(0.0, server.latency + random.uniform(-server.jitter, server.jitter)))
+
+        if not admitted or random.random() < server.rate_limit_rate:
+            server.count("rate_limited")
+            error = json.dumps({"error": {"message": "Rate limit reached (mock)", "type": "requests", "code": "rate_limit_exceeded"}})
+            self._send(429, error.encode(), {"retry-after-ms": str(int(server.retry_after * 1000)), **headers})
+            return
+
+        server.count("completions")
+        content = server.respond(body)
+        completion = {
+            "id": f"chatcmpl-benchmark-{server.counts['completions']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens}
+            }
+        }
+        if body.get("logprobs"):
+            completion["choices"][0]["logprobs"] = server.token_logprobs(body, content)
+        self._send(200, json.dumps(completion).encode(), headers)
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency, jitter, rate_limit_rate, retry_after, qualify_rate, requests_per_minute=0, tokens_per_minute=0,
+                 low_confidence_rate=0.0, cache_min_tokens=MOCK_CACHE_MIN_TOKENS):
+        super().__init__(("127.0.0.1", 0), MockOpenAIHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.qualify_rate = qualify_rate
+        self.low_confidence_rate = low_confidence_rate
+        self.cache_min_tokens = cache_min_tokens
+        self.limits = {name: limit for name, limit in (("requests", requests_per_minute), ("tokens", tokens_per_minute)) if limit}
+        self.budgets = {}  # Model -> {"limits", "levels", "refilled_at"}; the API limits each model separately
+        self.counts = {"completions": 0, "rate_limited": 0}
+        self.prefixes = set()  # Hashes of prompt prefixes seen so far, as in the API's prompt cache
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def cached_prompt_tokens(self, body):
+        """
+        Tokens of the longest prefix of this prompt seen before, counted like the
+        API's prompt cache: from cache_min_tokens up, in MOCK_CACHE_BLOCK_TOKENS steps.
+        """
+        # Prompt caches are per model
+        text = body["model"] + "".join(f"{message['role']}:{message['content']}" for message in body["messages"])
+        lengths = range(self.cache_min_tokens, len(text) // 4 + 1, MOCK_CACHE_BLOCK_TOKENS)
+        hashes = [(length, hashlib.sha256(text[:length * 4].encode()).digest()) for length in lengths]
+        with self._lock:
+            cached = max((length for length, digest in hashes if digest in self.prefixes), default=0)
+            self.prefixes.update(digest for _, digest in hashes)
+        return cached
+
+    def admit(self, model, tokens):
+        """Charge one request and tokens to the model's per-minute budgets. Returns (admitted, rate-limit headers)."""
+        if not self.limits:
+            return True, {}
+        cost = {"requests": 1, "tokens": tokens}
+        with self._lock:
+            now = time.monotonic()
+            if model not in self.budgets:
+                limits = {name: limit * MOCK_MODEL_LIMIT_FACTORS.get(model, 1) for name, limit in self.limits.items()}
+                self.budgets[model] = {"limits": limits, "levels": dict(limits), "refilled_at": now}
+            budget = self.budgets[model]
+            limits, levels = budget["limits"], budget["levels"]
+            for name, limit in limits.items():
+                levels[name] = min(limit, levels[name] + (now - budget["refilled_at"]) * limit / 60)
+            budget["refilled_at"] = now
+            admitted = all(levels[name] >= cost[name] for name in limits)
+            if admitted:
+                for name in limits:
+                    levels[name] -= cost[name]
+            headers = {}
+            for name, limit in limits.items():
+                headers[f"x-ratelimit-limit-{name}"] = str(limit)
+                headers[f"x-ratelimit-remaining-{name}"] = str(max(0, int(levels[name])))
+                headers[f"x-ratelimit-reset-{name}"] = f"{(limit - levels[name]) * 60 / limit:.3f}s"
+            return admitted, headers
+
+    def respond(self, body):
+        """Deterministic answer for a qualification, combined or single-criterion prompt."""
+        prompt = body["messages"][-1]["content"]
+        digest = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+        if "YES/NO" in prompt:
+            qualified = digest % 1000 < self.qualify_rate * 1000
+            return f"{'YES' if qualified else 'NO'}\nBenchmark answer."
+        score = digest % 10 + 1
+        if body.get("response_format", {}).get("type") == "json_object":
+            return json.dumps({"evaluations": [
+                {"criterion": criterion, "score": score, "justification": "Benchmark answer."}
+                for criterion in re.findall(r"Criterion: (.+)\nWeight:", prompt)
+            ]})
+        return f"### Score: {score}\n\n### Justification:\nBenchmark answer."
+
+    def token_logprobs(self, body, content):
+        """Per-token logprobs for content; a low_confidence_rate share of YES/NO and score tokens is made uncertain."""
+        prompt = body["messages"][-1]["content"]
+        logprobs = []
+        for index, token in enumerate(re.findall(r"\w+|\s+|[^\w\s]+", content)):
+            probability = 1.0
+            if token.isdigit() or token.upper() in ("YES", "NO"):
+                digest = int(hashlib.sha256(f"{prompt}\0{index}".encode()).hexdigest(), 16)
+                probability = 0.4 if digest % 1000 < self.low_confidence_rate * 1000 else 0.98
+            logprobs.append({"token": token, "logprob": math.log(probability), "bytes": list(token.encode()), "top_logprobs": []})
+        return {"content": logprobs}
+
+class MockS3Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, bucket, corpus, page_size):
+        super().__init__(("127.0.0.1", 0), MockS3Handler)
+        self.bucket = bucket
+        self.corpus = corpus
+        self.page_size = page_size
+
+def start_server(server):
+    """Serve in a daemon thread and return the server's base URL."""
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+def load_corpus(corpus_dir, folder, copies):
+    """Map S3 keys under folder to corpus files, repeating the corpus copies times."""
+    files = sorted(name for name in os.listdir(corpus_dir) if name.lower().endswith(CORPUS_EXTENSIONS))
+    corpus = {}
+    for copy in range(copies):
+        prefix = folder if copy == 0 else f"{folder}copy{copy}/"
+        for name in files:
+            corpus[prefix + name] = os.path.join(corpus_dir, name)
+    return corpus
+
+def peak_memory_mb():
+    """Peak resident memory of this process and of its (extraction) child processes, in MB."""
+    # ru_maxrss is in kilobytes on Linux
+    return {
+        "main_process": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "child_processes": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1)
+    }
+
+def run_benchmark(args):
+    """Run the pipeline over the corpus against the local servers and return the report dict."""
+    corpus = load_corpus(args.corpus, BENCHMARK_FOLDER, args.copies)
+    s3_server = MockS3Server(BENCHMARK_BUCKET, corpus, args.list_page_size)
+    openai_server = MockOpenAIServer(
+        args.latency, args.jitter, args.rate_limit_rate, args.retry_after, args.qualify_rate,
+        args.mock_requests_per_minute, args.mock_tokens_per_minute, args.low_confidence_rate, args.mock_cache_min_tokens
+    )
+    s3_url = start_server(s3_server)
+    openai_url = start_server(openai_server)
+
+    transport.close_clients()
+    transport.configure(
+        openai_api_key="benchmark",
+        openai_base_url=f"{openai_url}/v1",
+        aws_access_key_id="benchmark",
+        aws_secret_access_key="benchmark",
+        region_name="us-east-1",
+        s3_endpoint_url=s3_url,
+        pool_size=max(10, args.concurrency + 1)
+    )
+
+    # Cold runs use no caches; warm runs use empty caches in a scratch directory
+    # so that repeated passes (--copies) measure cache and duplicate hits without touching ./cache
+    cache_dir = tempfile.mkdtemp(prefix="benchmark-cache-")
+    gpt.CACHE_ENABLED = gpt.DEDUP_ENABLED = extraction.TEXT_CACHE_ENABLED = args.use_cache
+    extraction.TEXT_CACHE_PATH = os.path.join(cache_dir, "text.sqlite3")
+    cache.CACHE_PATH = os.path.join(cache_dir, "results.sqlite3")
+    ratelimit.STATE_PATH = os.path.join(cache_dir, "ratelimit.json")
+    dedup.DEDUP_PATH = os.path.join(cache_dir, "dedup.sqlite3")
+    gpt.EVALUATION_MODE = args.evaluation_mode
+    gpt.CASCADE_ENABLED = args.cascade
+    gpt.cascade_stats = CascadeStats()
+    gpt.SPECULATION_MODE = args.speculation
+    gpt.speculation_policy = SpeculationPolicy()
+    leaderboard = gpt.enable_ranking(args.top_k)
+    metrics.batch_metrics.reset()
+
+    try:
+        started = time.perf_counter()
+        resume_keys = gpt.iter_files_in_folder(BENCHMARK_BUCKET, BENCHMARK_FOLDER)
+        results = asyncio.run(gpt.process_resumes_async(BENCHMARK_BUCKET, resume_keys, args.concurrency))
+        wall_seconds = time.perf_counter() - started
+    finally:
+        # Discarded speculative evaluations may still be calling the mock server
+        gpt.shutdown_speculation_executor()
+        s3_server.shutdown()
+        openai_server.shutdown()
+        transport.close_clients()
+        extraction.shutdown_extraction_pool()
+
+    statuses = {}
+    for result in results:
+        status = "Error" if "error" in result else result["status"]
+        statuses[status] = statuses.get(status, 0) + 1
+
+    return {
+        "config": {
+            "corpus_files": len(corpus),
+            "copies": args.copies,
+            "concurrency": args.concurrency,
+            "evaluation_mode": args.evaluation_mode,
+            "use_cache": args.use_cache,
+            "top_k": args.top_k,
+            "cascade_enabled": args.cascade,
+            "speculation_mode": args.speculation,
+            "mock_low_confidence_rate": args.low_confidence_rate,
+            "prescreen_enabled": gpt.PRESCREEN_ENABLED,
+            "preprocess_enabled": gpt.PREPROCESS_ENABLED,
+            "mock_latency_seconds": args.latency,
+            "mock_jitter_seconds": args.jitter,
+            "mock_rate_limit_rate": args.rate_limit_rate,
+            "mock_requests_per_minute": args.mock_requests_per_minute,
+            "mock_tokens_per_minute": args.mock_tokens_per_minute,
+            "mock_cache_min_tokens": args.mock_cache_min_tokens,
+            "rate_limit_enabled": gpt.RATE_LIMIT_ENABLED
+        },
+        "resumes": len(results),
+        "statuses": statuses,
+        "wall_seconds": round(wall_seconds, 3),
+        "resumes_per_minute": round(len(results) / wall_seconds * 60, 2) if wall_seconds else None,
+        "pipeline": metrics.batch_metrics.report(),
+        "ranking": leaderboard.report() if leaderboard else None,
+        "cascade": gpt.cascade_stats.report() if args.cascade else None,
+        "speculation": gpt.speculation_policy.report() if args.speculation != OFF else None,
+        "mock_server": dict(openai_server.counts),
+        "rate_limiter": ratelimit.get_rate_limiter().report() if gpt.RATE_LIMIT_ENABLED else None,
+        "peak_memory_mb": peak_memory_mb()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark over resume_repository with local S3 and OpenAI stand-ins.")
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="Directory of resumes (any format extraction.py supports)")
+    parser.add_argument("--copies", type=int, default=1, help="Serve the corpus this many times under different keys")
+    parser.add_argument("--concurrency", type=int, default=gpt.MAX_CONCURRENCY)
+    parser.add_argument("--evaluation-mode", choices=("combined", "per_criterion"), default=gpt.EVALUATION_MODE)
+    parser.add_argument("--top-k", type=int, default=0, help="Run in ranking mode, keeping the best K candidates (0 scores every criterion)")
+    parser.add_argument("--no-cascade", dest="cascade", action="store_false", help="Send every call to the strong model")
+    parser.add_argument("--speculation", choices=(OFF, ON, AUTO), default=gpt.SPECULATION_MODE,
+                        help="Evaluate criteria while GPT decides qualification (auto: only while enough resumes qualify)")
+    parser.add_argument("--use-cache", action="store_true", help="Enable the text and result caches and duplicate detection (in a scratch directory)")
+    parser.add_argument("--latency", type=float, default=1.0, help="Mean mock GPT latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.3, help="Uniform +/- jitter on the mock latency in seconds")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of mock GPT calls answered with 429")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="Retry-after sent with injected 429s, in seconds")
+    # The defaults match a high usage tier; the limiter adopts them from the mock's rate-limit headers
+    parser.add_argument("--mock-requests-per-minute", type=int, default=10000, help="Mock API request budget per model, times MOCK_MODEL_LIMIT_FACTORS (0 for none)")
+    parser.add_argument("--mock-tokens-per-minute", type=int, default=2000000, help="Mock API token budget per model, times MOCK_MODEL_LIMIT_FACTORS (0 for none)")
+    parser.add_argument("--low-confidence-rate", type=float, default=0.1, help="Share of fast-tier answers and scores the mock makes uncertain")
+    parser.add_argument("--mock-cache-min-tokens", type=int, default=MOCK_CACHE_MIN_TOKENS,
+                        help="Shortest shared prompt prefix the mock reports as cached tokens")
+    parser.add_argument("--qualify-rate", type=float, default=0.6, help="Share of GPT qualification checks answered YES")
+    parser.add_argument("--list-page-size", type=int, default=LIST_PAGE_SIZE, help="Keys per mock S3 listing page")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for mock jitter and 429 injection")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    report = run_benchmark(args)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import json
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# Logging Configuration
+logger = logging.getLogger(__name__)
+
+# Cache Configuration
+CACHE_PATH = "./cache/results.sqlite3"
+CACHE_MAX_BYTES = 256 * 1024 * 1024  # Least recently used entries are evicted above this size
+CACHE_MAX_AGE_SECONDS = 30 * 24 * 60 * 60  # Entries older than this are never returned
+
+def content_hash(data):
+    """Return the SHA-256 hex digest of a str or bytes value."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+def make_key(*parts):
+    """Build a cache key from JSON-serialisable parts (content hash, prompt, model, criterion...)."""
+    return content_hash(json.dumps(parts, sort_keys=True, ensure_ascii=False))
+
+class ResultCache:
+    """
+    Persistent key/value cache stored in a SQLite file.
+    Values are JSON-serialisable objects. Safe to share between threads and
+    between processes on the same host.
+    """
+
+    def __init__(self, path=None, max_bytes=CACHE_MAX_BYTES, max_age_seconds=CACHE_MAX_AGE_SECONDS):
+        path = path or CACHE_PATH  # Read at call time so CACHE_PATH can be redirected (e.g. to /tmp on Lambda)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+
+    def get(self, key):
+        """Return the cached value for key, or None if it is missing or expired."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.max_age_seconds:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        """Store value under key and evict old entries if the cache is over its limits."""
+        payload = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now)
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.max_age_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently used entries until the cache fits again
+        freed = 0
+        stale_keys = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            stale_keys.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", stale_keys)
+        logger.info(f"Evicted {len(stale_keys)} cache entries ({freed} bytes) from {self.path}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,74 @@
+import bisect
+import json
+import math
+import re
+import threading
+
+ANSWER_PATTERN = re.compile(r"\b(YES|NO)\b", re.IGNORECASE)
+FIRST_LINE_ANSWER_PATTERN = re.compile(r"\A[^\n]*?\b(YES|NO)\b", re.IGNORECASE)  # The answer opening a reply
+JSON_SCORE_PATTERN = re.compile(r'"score"\s*:\s*(\d+)')
+TEXT_SCORE_PATTERN = re.compile(r"Score:\**\s*(\d+)", re.IGNORECASE)
+
+def token_probabilities(response, pattern):
+    """
+    Probability the model gave to the token that starts each match of pattern's
+    first group in the response, in order. None when the response has no logprobs.
+    """
+    logprobs = response.choices[0].logprobs
+    tokens = getattr(logprobs, "content", None)
+    if not tokens:
+        return None
+    offsets = []
+    text = ""
+    for token in tokens:
+        offsets.append(len(text))
+        text += token.token
+    return [
+        math.exp(tokens[bisect.bisect_right(offsets, match.start(1)) - 1].logprob)
+        for match in pattern.finditer(text)
+    ]
+
+def first_line_answers(text):
+    """Distinct YES/NO words (upper case) on the first line of a qualification reply."""
+    return {answer.upper() for answer in ANSWER_PATTERN.findall(text.split("\n", 1)[0])}
+
+def answer_confidence(response):
+    """Probability of the first YES/NO token on the first line of a qualification answer (None if unknown or absent)."""
+    probabilities = token_probabilities(response, FIRST_LINE_ANSWER_PATTERN)
+    return probabilities[0] if probabilities else None
+
+def text_score_confidence(response):
+    """Probability of the final score token in a single-criterion evaluation (None if unknown)."""
+    probabilities = token_probabilities(response, TEXT_SCORE_PATTERN)
+    return probabilities[-1] if probabilities else None
+
+def json_score_confidences(response):
+    """Probability of each criterion's score token in a combined JSON evaluation ({} if unknown)."""
+    probabilities = token_probabilities(response, JSON_SCORE_PATTERN)
+    try:
+        entries = json.loads(response.choices[0].message.content).get("evaluations", [])
+        criteria = [entry.get("criterion") for entry in entries if isinstance(entry, dict) and "score" in entry]
+    except (json.JSONDecodeError, AttributeError):
+        return {}
+    if not probabilities or len(probabilities) != len(criteria):
+        return {}
+    return dict(zip(criteria, probabilities))
+
+class CascadeStats:
+    """Thread-safe counts of answers settled by the fast model and of escalations to the strong model."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {}
+
+    def record(self, kind, escalated):
+        with self._lock:
+            counts = self.counts.setdefault(kind, {"fast": 0, "escalated": 0})
+            counts["escalated" if escalated else "fast"] += 1
+
+    def report(self):
+        with self._lock:
+            return {
+                kind: {**counts, "escalation_rate": counts["escalated"] / (counts["fast"] + counts["escalated"])}
+                for kind, counts in self.counts.items()
+            }
@@ -0,0 +1,158 @@
+import json
+from cache import content_hash
+
+# Criteria Configuration
+DEFAULT_WEIGHT = 10
+CRITERION_WEIGHTS = {}  # Weight per criterion; criteria not listed get DEFAULT_WEIGHT
+MAX_EXAMPLES_PER_CRITERION = 3  # Few-shot examples shown in a criterion's prompt
+VERSION_LENGTH = 12  # Hex digits of a criterion version
+
+# Static Examples
+EXAMPLES = [
+    {"criterion": "LLM Experience and Knowledge",
+     "example": "Built a chatbot for multiple PDFs and videos using LangChain, NLTK, and SpaCy, and deployed it via Streamlit.",
+     "score": 7,
+     "explanation": "Demonstrates advanced proficiency in working with LLMs, integrating them into applications, and deploying solutions effectively."},
+
+    {"criterion": "LLM Experience and Knowledge",
+     "example": "Made a project on Retrieval-Augmented Generation (RAG) development and Large Language Models (LLMs).",
+     "score": 9,
+     "explanation": "Shows theoretical knowledge and interest in state-of-the-art techniques but lacks practical project implementation."},
+
+    {"criterion": "LLM Experience and Knowledge",
+     "example": "Participated in academic research exploring applications of LLMs in education.",
+     "score": 5,
+     "explanation": "Limited scope of application and lacks substantial implementation experience."},
+
+    {"criterion": "LLM Experience and Knowledge",
+     "example": "Conducted a basic study of ChatGPT's capabilities for answering domain-specific queries.",
+     "score": 2,
+     "explanation": "Minimal hands-on work, focused more on exploration than implementation or deployment."},
+
+    {"criterion": "Good Institute (IIT or NIT)",
+     "example": "Student at one of the old IITs ",
+     "score": 10,
+     "explanation": "IIT is among the top institutions in India, reflecting strong academic credentials and a competitive environment."},
+
+    {"criterion": "Good Institute (IIT or NIT)",
+     "example": "Graduate from NIT Suratkal in Computer Science.",
+     "score": 8,
+     "explanation": "NIT Suratkal is a prestigious institution with a strong focus on technical education and research."},
+
+    {"criterion": "Good Institute (IIT or NIT)",
+     "example": "Student at a private engineering college with good regional reputation.",
+     "score": 6,
+     "explanation": "While the institution is not IIT/NIT, it is still reputable in a regional context."},
+
+    {"criterion": "Generative AI Experience",
+     "example": "Developed a virtual try-on system using GANs, PyTorch, and OpenCV.",
+     "score": 10,
+     "explanation": "Demonstrates expertise in Generative AI, leveraging advanced techniques for real-world applications."},
+
+    {"criterion": "Generative AI Experience",
+     "example": "Explored GAN-based image generation as part of an academic project.",
+     "score": 7,
+     "explanation": "Theoretical knowledge with limited practical experience in implementing and deploying systems."},
+
+    {"criterion": "Generative AI Experience",
+     "example": "Built a simple image generator using a pre-trained GAN model.",
+     "score": 5,
+     "explanation": "Basic implementation using pre-trained models without significant customization or original contributions."},
+
+    {"criterion": "Generative AI Experience",
+     "example": "Read research papers on diffusion models and GANs.",
+     "score": 3, 
+     "explanation": "Shows interest and theoretical knowledge but lacks hands-on experience."},
+
+    {"criterion": "Leadership and Teamwork", 
+     "example": "Led a team for a fraud detection model.", 
+     "score": 8, 
+     "explanation": "Proven leadership and teamwork skills."},
+
+    {"criterion": "Leadership and Teamwork", 
+     "example": "Organized a hackathon for 200 participants.", 
+     "score": 5, 
+     "explanation": "Moderate leadership experience."}
+]
+
+# Resume sections each criterion's prompt needs (see preprocess.SECTION_HEADINGS).
+# Criteria not listed here receive the whole resume.
+CRITERION_SECTIONS = {
+    "LLM Experience and Knowledge": ("summary", "experience", "projects", "skills", "achievements"),
+    "Good Institute (IIT or NIT)": ("header", "education"),
+    "Generative AI Experience": ("summary", "experience", "projects", "skills", "achievements"),
+    "Leadership and Teamwork": ("experience", "projects", "leadership", "achievements")
+}
+
+class Criterion:
+    """
+    One hiring criterion: its weight, the resume sections its prompt needs
+    (None for the whole resume) and the few-shot examples shown with it.
+    version is derived from all of these, so it changes exactly when the
+    criterion's prompt or routing does.
+    """
+
+    def __init__(self, name, weight=DEFAULT_WEIGHT, sections=None, examples=()):
+        self.name = name
+        self.weight = weight
+        self.sections = tuple(sections) if sections is not None else None
+        self.examples = [dict(example) for example in examples]
+        definition = {"name": name, "weight": weight, "sections": self.sections, "examples": self.examples}
+        self.version = content_hash(json.dumps(definition, sort_keys=True, ensure_ascii=False))[:VERSION_LENGTH]
+
+class CriteriaRegistry:
+    """Criteria to evaluate, in registration order (a stable order keeps prompts identical across runs)."""
+
+    def __init__(self):
+        self._criteria = {}
+
+    @classmethod
+    def from_examples(cls, examples, sections=None, weights=None, default_weight=DEFAULT_WEIGHT,
+                      max_examples=MAX_EXAMPLES_PER_CRITERION):
+        """Registry with one criterion per distinct "criterion" in examples, in order of first appearance."""
+        registry = cls()
+        for name in dict.fromkeys(example["criterion"] for example in examples):
+            registry.register(
+                name,
+                (weights or {}).get(name, default_weight),
+                (sections or {}).get(name),
+                [example for example in examples if example["criterion"] == name][:max_examples]
+            )
+        return registry
+
+    def register(self, name, weight=DEFAULT_WEIGHT, sections=None, examples=()):
+        """Add or replace a criterion; returns it."""
+        self._criteria[name] = Criterion(name, weight, sections, examples)
+        return self._criteria[name]
+
+    def __contains__(self, name):
+        return name in self._criteria
+
+    def __iter__(self):
+        return iter(self._criteria)
+
+    def get(self, name):
+        return self._criteria.get(name)
+
+    def weights(self):
+        """{criterion: weight} for every registered criterion."""
+        return {name: criterion.weight for name, criterion in self._criteria.items()}
+
+    def versions(self, names=None):
+        """{criterion: version} for the given registered criteria (all by default)."""
+        names = self._criteria if names is None else names
+        return {name: self._criteria[name].version for name in names if name in self._criteria}
+
+    def examples(self, name):
+        """Few-shot examples for a criterion ([] for criteria outside the registry)."""
+        return self._criteria[name].examples if name in self._criteria else []
+
+    def sections(self, name):
+        """Resume sections a criterion's prompt needs, or None for the whole resume."""
+        return self._criteria[name].sections if name in self._criteria else None
+
+    def stale_criteria(self, recorded_versions):
+        """Registered criteria whose current version differs from (or is missing in) recorded_versions."""
+        return [name for name, criterion in self._criteria.items() if recorded_versions.get(name) != criterion.version]
+
+registry = CriteriaRegistry.from_examples(EXAMPLES, CRITERION_SECTIONS, CRITERION_WEIGHTS)
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from preprocess import compact_resume_text
+
+# Logging Configuration
+logger = logging.getLogger(__name__)
+
+# Duplicate Detection Configuration
+DEDUP_PATH = "./cache/dedup.sqlite3"
+DEDUP_MAX_BYTES = 256 * 1024 * 1024  # Least recently matched resumes are evicted above this size
+DEDUP_MAX_AGE_SECONDS = 30 * 24 * 60 * 60  # Resumes indexed longer ago than this are never matched
+SIMILARITY_THRESHOLD = 0.85  # Estimated Jaccard similarity of word shingles above which results are reused
+SHINGLE_SIZE = 5  # Words per shingle
+NUM_PERMUTATIONS = 128  # MinHash signature length
+BANDS = 32  # LSH bands of NUM_PERMUTATIONS // BANDS rows; more bands find less similar candidates
+
+MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(20241212)  # Fixed seed: signatures must stay comparable across runs
+PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(MERSENNE_PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+def normalized_lines(text):
+    """Compacted, lowercased resume lines, as compared by shingles() and line_changes()."""
+    return [line.lower() for line in compact_resume_text(text).splitlines()]
+
+def shingles(text):
+    """Set of hashed SHINGLE_SIZE-word shingles of the normalised resume text."""
+    words = re.findall(r"\w+", "\n".join(normalized_lines(text)))
+    if len(words) < SHINGLE_SIZE:
+        words = words + [""] * (SHINGLE_SIZE - len(words))
+    return {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + SHINGLE_SIZE]).encode(), digest_size=8).digest(), "big")
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+def minhash(text):
+    """MinHash signature (NUM_PERMUTATIONS integers) of the resume's shingles."""
+    values = shingles(text)
+    return [min((a * value + b) % MERSENNE_PRIME for value in values) for a, b in PERMUTATIONS]
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of the documents behind two signatures."""
+    return sum(1 for x, y in zip(signature, other) if x == y) / len(signature)
+
+def band_keys(signature):
+    rows = len(signature) // BANDS
+    return [
+        (band, hashlib.blake2b(json.dumps(signature[band * rows:(band + 1) * rows]).encode(), digest_size=8).hexdigest())
+        for band in range(BANDS)
+    ]
+
+def line_changes(text, other_lines):
+    """Count lines added to and removed from other_lines in text."""
+    lines = set(normalized_lines(text))
+    other = set(other_lines)
+    return {"lines_added": len(lines - other), "lines_removed": len(other - lines)}
+
+class DuplicateIndex:
+    """
+    Persistent MinHash/LSH index of processed resumes and their results, in a
+    SQLite file, evicted like ResultCache: by age and, least recently matched
+    first, by size. Safe to share between threads and between processes on the
+    same host.
+    """
+
+    def __init__(self, path=None, threshold=None, max_bytes=DEDUP_MAX_BYTES, max_age_seconds=DEDUP_MAX_AGE_SECONDS):
+        path = path or DEDUP_PATH
+        self.path = path
+        self.threshold = SIMILARITY_THRESHOLD if threshold is None else threshold
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "resume_key TEXT PRIMARY KEY, context TEXT NOT NULL, signature TEXT NOT NULL, "
+                "lines TEXT NOT NULL, result TEXT NOT NULL, created_at REAL NOT NULL, "
+                "size INTEGER NOT NULL DEFAULT 0, accessed_at REAL NOT NULL DEFAULT 0)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+            if "accessed_at" not in columns:  # Index created before eviction; its documents are evicted first
+                self._conn.execute("ALTER TABLE documents ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+                self._conn.execute("ALTER TABLE documents ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS documents_accessed_at ON documents (accessed_at)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS bands (band INTEGER, bucket TEXT, resume_key TEXT)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, bucket)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS bands_resume_key ON bands (resume_key)")
+
+    def find(self, resume_key, resume_text, signature, context):
+        """
+        Return the most similar earlier resume scored under the same context
+        (model and criteria) as a dict with resume_key, similarity, result and
+        line changes, or None when nothing reaches the threshold. The resume's
+        own earlier entry (a rerun of the same key) and expired entries are not
+        duplicates.
+        """
+        keys = band_keys(signature)
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT d.resume_key, d.signature, d.lines, d.result FROM bands b "
+                "JOIN documents d ON d.resume_key = b.resume_key "
+                "WHERE d.context = ? AND d.resume_key != ? AND d.created_at >= ? "
+                f"AND ({' OR '.join(['(b.band = ? AND b.bucket = ?)'] * len(keys))})",
+                [context, resume_key, now - self.max_age_seconds] + [value for key in keys for value in key]
+            ).fetchall()
+
+        best = None
+        for other_key, stored_signature, lines, result in rows:
+            score = similarity(signature, json.loads(stored_signature))
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (other_key, score, lines, result)
+        if best is None:
+            return None
+        other_key, score, lines, result = best
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE documents SET accessed_at = ? WHERE resume_key = ?", (now, other_key))
+        return {
+            "resume_key": other_key,
+            "similarity": round(score, 3),
+            "result": json.loads(result),
+            **line_changes(resume_text, json.loads(lines))
+        }
+
+    def add(self, resume_key, resume_text, signature, context, result):
+        """
+        Index a processed resume with the (JSON-serialisable) result to reuse
+        for its duplicates, and evict old entries if the index is over its limits.
+        """
+        values = (
+            json.dumps(signature), json.dumps(normalized_lines(resume_text), ensure_ascii=False),
+            json.dumps(result, ensure_ascii=False)
+        )
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM bands WHERE resume_key = ?", (resume_key,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (resume_key, context, signature, lines, result, created_at, size, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (resume_key, context, *values, now, sum(len(value) for value in values), now)
+            )
+            self._conn.executemany(
+                "INSERT INTO bands (band, bucket, resume_key) VALUES (?, ?, ?)",
+                [(band, bucket, resume_key) for band, bucket in band_keys(signature)]
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        expired = "SELECT resume_key FROM documents WHERE created_at < ?"
+        self._conn.execute(f"DELETE FROM bands WHERE resume_key IN ({expired})", (now - self.max_age_seconds,))
+        self._conn.execute("DELETE FROM documents WHERE created_at < ?", (now - self.max_age_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently matched resumes until the index fits again
+        freed = 0
+        stale_keys = []
+        for key, size in self._conn.execute("SELECT resume_key, size FROM documents ORDER BY accessed_at"):
+            stale_keys.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM bands WHERE resume_key = ?", stale_keys)
+        self._conn.executemany("DELETE FROM documents WHERE resume_key = ?", stale_keys)
+        logger.info(f"Evicted {len(stale_keys)} resumes ({freed} bytes) from the duplicate index {self.path}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,290 @@
+import io
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+from xml.etree import ElementTree
+from cache import ResultCache, content_hash, make_key
+from preprocess import PAGE_BREAK
+
+# Logging Configuration
+logger = logging.getLogger(__name__)
+
+# Extraction Configuration
+EXTRACTION_WORKERS = os.cpu_count() or 1  # Processes used for document parsing; 0 parses on the calling thread
+PAGE_TIMEOUT_SECONDS = 10  # Pages that take longer are skipped
+DOCUMENT_TIMEOUT_SECONDS = 120  # Upper bound on waiting for one document from the pool
+EXTRACTION_MAX_CHARS = 24000  # Later pages are not decoded once this much text is extracted (about 6000 tokens)
+OCR_PROBE_PAGES = 2  # A document with almost no text on its first pages is marked as needing OCR
+MIN_TEXT_WORDS = 30
+EXTRACTOR_VERSION = "extract-3"  # Part of the text cache key; bump when extraction output changes
+TEXT_CACHE_ENABLED = True
+TEXT_CACHE_PATH = "./cache/text.sqlite3"
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+EXTRACTORS = {}  # File extension -> function(data, page_timeout) yielding the text of each page
+_pool = None
+_text_cache = None
+_lock = threading.Lock()
+
+class PageTimeoutError(Exception):
+    """Raised inside a worker when a single page exceeds PAGE_TIMEOUT_SECONDS."""
+
+class UnreadableResumeError(Exception):
+    """Raised when a document has no usable text (scanned, image, encrypted or unsupported) and needs OCR or manual review."""
+
+def _raise_page_timeout(signum, frame):
+    raise PageTimeoutError()
+
+def register_extractor(*extensions):
+    """Register a page generator for the given file extensions."""
+    def register(function):
+        for extension in extensions:
+            EXTRACTORS[extension] = function
+        return function
+    return register
+
+@register_extractor(".pdf")
+def iter_pdf_pages(data, page_timeout=PAGE_TIMEOUT_SECONDS):
+    """
+    Yield the text of each PDF page using PyPDF2, decoding a page only when it
+    is asked for. Pages that take longer than page_timeout seconds are skipped.
+    The timeout needs SIGALRM, so it only applies on the main thread of a Unix
+    process (which is where pool workers run).
+    """
+    import PyPDF2  # Only pool workers (or the calling thread when EXTRACTION_WORKERS is 0) need the parser
+
+    try:
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(data))
+        if pdf_reader.is_encrypted and not pdf_reader.decrypt(""):
+            raise UnreadableResumeError("encrypted PDF")
+        page_count = len(pdf_reader.pages)
+    except PyPDF2.errors.PyPdfError as e:
+        raise UnreadableResumeError(f"unreadable PDF: {e}")
+
+    use_alarm = hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_page_timeout)
+
+    try:
+        for page_num in range(page_count):
+            try:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, page_timeout)
+                page_text = pdf_reader.pages[page_num].extract_text()
+            except PageTimeoutError:
+                logger.warning(f"Skipped PDF page {page_num + 1}: extraction took longer than {page_timeout}s")
+                continue
+            finally:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+            yield page_text
+    finally:
+        if use_alarm:
+            signal.signal(signal.SIGALRM, previous_handler)
+
+def _iter_docx_part(xml_file):
+    """Yield the paragraphs of one WordprocessingML part, with None at each page break."""
+    paragraphs = []  # Stack: text boxes nest paragraphs inside paragraphs
+    page_break = False
+    for event, element in ElementTree.iterparse(xml_file, events=("start", "end")):
+        tag = element.tag
+        if event == "start":
+            if tag == WORD_NAMESPACE + "p":
+                paragraphs.append([])
+            continue
+        if tag == WORD_NAMESPACE + "t" and paragraphs:
+            paragraphs[-1].append(element.text or "")
+        elif tag == WORD_NAMESPACE + "tab" and paragraphs:
+            paragraphs[-1].append("\t")
+        elif tag == WORD_NAMESPACE + "br" and paragraphs:
+            if element.get(WORD_NAMESPACE + "type") == "page":
+                page_break = True
+            else:
+                paragraphs[-1].append("\n")
+        elif tag == WORD_NAMESPACE + "lastRenderedPageBreak":
+            page_break = True
+        elif tag == WORD_NAMESPACE + "p":
+            yield "".join(paragraphs.pop())
+            if page_break and not paragraphs:
+                yield None
+                page_break = False
+            element.clear()
+
+@register_extractor(".docx")
+def iter_docx_pages(data, page_timeout=None):
+    """
+    Yield the text of a DOCX document page by page, using the page breaks Word
+    recorded in the file (a document without them is a single page). Header
+    text, which often holds the contact details, comes first.
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile as e:
+        raise UnreadableResumeError(f"unreadable DOCX: {e}")
+
+    with archive:
+        names = archive.namelist()
+        if "word/document.xml" not in names:
+            raise UnreadableResumeError("DOCX without word/document.xml")
+        headers = sorted(name for name in names if name.startswith("word/header") and name.endswith(".xml"))
+
+        lines = []
+        for name in headers + ["word/document.xml"]:
+            with archive.open(name) as xml_file:
+                for paragraph in _iter_docx_part(xml_file):
+                    if paragraph is None:
+                        yield "\n".join(lines)
+                        lines = []
+                    else:
+                        lines.append(paragraph)
+        if lines:
+            yield "\n".join(lines)
+
+@register_extractor(".txt")
+def iter_text_pages(data, page_timeout=None):
+    """Yield a plain-text document split at form feeds."""
+    for encoding in ("utf-8-sig", "cp1252"):
+        try:
+            text = data.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        text = data.decode("latin-1")
+    yield from text.split(PAGE_BREAK)
+
+@register_extractor(".png", ".jpg", ".jpeg", ".tif", ".tiff")
+def iter_image_pages(data, page_timeout=None):
+    """Images have no text layer; they are marked for OCR without being decoded."""
+    raise UnreadableResumeError("image file; needs OCR")
+    yield
+
+SUPPORTED_EXTENSIONS = tuple(EXTRACTORS)
+
+def detect_format(data, filename=None):
+    """Registered extension for a document, from its content where recognisable, else from its name."""
+    if b"%PDF" in data[:1024]:
+        return ".pdf"
+    if data.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                if "word/document.xml" in archive.namelist():
+                    return ".docx"
+        except zipfile.BadZipFile:
+            pass
+    if data.startswith(b"\x89PNG"):
+        return ".png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if extension in EXTRACTORS else None
+
+def extract_document(data, document_format, max_chars=EXTRACTION_MAX_CHARS, page_timeout=PAGE_TIMEOUT_SECONDS):
+    """
+    Join the pages of a document, stopping once max_chars of text has been
+    extracted. Raises UnreadableResumeError, without decoding further pages,
+    when the first OCR_PROBE_PAGES pages hold almost no text.
+    """
+    text_content = []
+    chars = words = 0
+    with closing(EXTRACTORS[document_format](data, page_timeout)) as pages:
+        for page_number, page_text in enumerate(pages, start=1):
+            text_content.append(page_text)
+            chars += len(page_text)
+            words += len(page_text.split())
+            if page_number == OCR_PROBE_PAGES and words < MIN_TEXT_WORDS:
+                raise UnreadableResumeError(f"no text layer on the first {page_number} pages; needs OCR")
+            if chars >= max_chars:
+                logger.info(f"Stopped extraction after page {page_number}: {chars} characters extracted")
+                break
+    if words < MIN_TEXT_WORDS:
+        raise UnreadableResumeError("no usable text; needs OCR")
+
+    # Pages are joined with a form feed so that running headers/footers can be told apart from content
+    return PAGE_BREAK.join(text_content)
+
+def get_extraction_pool():
+    """Return the shared extraction process pool, creating it on first use."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            # spawn avoids forking a process that already runs S3/GPT threads
+            _pool = ProcessPoolExecutor(
+                max_workers=EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+def shutdown_extraction_pool():
+    """Stop the extraction workers, if they were started."""
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+def _discard_pool(pool):
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def get_text_cache():
+    """Return the shared extracted-text cache, or None when it is disabled."""
+    global _text_cache
+    if not TEXT_CACHE_ENABLED:
+        return None
+    with _lock:
+        if _text_cache is None:
+            _text_cache = ResultCache(TEXT_CACHE_PATH)
+        return _text_cache
+
+def extract_text_from_bytes(data, filename=None):
+    """
+    Return the text of a PDF, DOCX or plain-text document given its bytes;
+    filename is only used when the format is not recognisable from the content.
+    Text is looked up by file hash first, so a document is only parsed once.
+    Raises UnreadableResumeError for documents that need OCR or manual review.
+    """
+    document_format = detect_format(data, filename)
+    if document_format is None:
+        raise UnreadableResumeError(f"unsupported file type {os.path.splitext(filename or '')[1] or '(unknown)'}")
+
+    cache = get_text_cache()
+    cache_key = make_key("text", EXTRACTOR_VERSION, EXTRACTION_MAX_CHARS, content_hash(data))
+    if cache:
+        cached = cache.get(cache_key)
+        if isinstance(cached, dict):
+            raise UnreadableResumeError(cached["unreadable"])
+        if cached is not None:
+            return cached
+
+    try:
+        if EXTRACTION_WORKERS > 0:
+            pool = get_extraction_pool()
+            try:
+                future = pool.submit(extract_document, data, document_format, EXTRACTION_MAX_CHARS, PAGE_TIMEOUT_SECONDS)
+                text = future.result(timeout=DOCUMENT_TIMEOUT_SECONDS)
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory); start a fresh pool for the next document
+                _discard_pool(pool)
+                raise
+        else:
+            text = extract_document(data, document_format)
+    except UnreadableResumeError as e:
+        # Remembered too, so the document is not parsed again on the next run
+        if cache:
+            cache.set(cache_key, {"unreadable": str(e)})
+        raise
+
+    if cache:
+        cache.set(cache_key, text)
+    return text
@@ -1,10 +1,24 @@
 import json
-import boto3
+import asyncio
 import os
 import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
-import PyPDF2
-import openai
+import metrics
+import ratelimit
+import transport
+from cache import ResultCache, content_hash, make_key
+from cascade import CascadeStats, answer_confidence, first_line_answers, json_score_confidences, text_score_confidence
+from criteria import registry as criteria_registry
+from dedup import DuplicateIndex, minhash
+from extraction import SUPPORTED_EXTENSIONS, UnreadableResumeError, extract_text_from_bytes, shutdown_extraction_pool
+from output import JsonlResultsWriter
+from preprocess import compact_resume_text, select_sections, split_sections
+from prescreen import PASS, PrescreenStats, prescreen_resume
+from ranking import Leaderboard, criteria_by_weight, parse_score, upper_bound
+from speculation import AUTO, OFF, SpeculationPolicy, SpeculativeTask
 
 # Logging Configuration
 logging.basicConfig(level=logging.INFO)
@@ -12,128 +26,164 @@ logger = logging.getLogger(__name__)
 
 # GPT-4 Configuration
 OPENAI_API_KEY = ""
-
-s3 = boto3.client(
-    "s3",
+GPT_MODEL = "gpt-4o"
+
+# Model Cascade Configuration
+CASCADE_ENABLED = True  # Qualify and score with FAST_MODEL first; only low-confidence answers go to GPT_MODEL
+FAST_MODEL = "gpt-4o-mini"
+MODEL_TEMPERATURES = {FAST_MODEL: 0.0}  # Greedy decoding keeps fast-tier confidences meaningful; other models use 0.7
+QUALIFICATION_MIN_CONFIDENCE = 0.9  # Probability of the fast model's YES/NO token below which GPT_MODEL decides
+SCORE_MIN_CONFIDENCE = 0.6  # Probability of a fast-model score token below which GPT_MODEL re-scores the criterion
+
+# Pipeline Configuration
+MAX_CONCURRENCY = 8  # Resumes processed at once; 1 keeps the sequential loop
+EVALUATION_MODE = "combined"  # "combined": one GPT call for all criteria, "per_criterion": one call each
+MAX_EVALUATION_RETRIES = 2  # Extra calls for criteria missing from a combined response or evaluations without a score line
+CACHE_ENABLED = True  # Reuse qualification/evaluation results for unchanged resumes and prompts
+DEDUP_ENABLED = True  # Reuse results of near-duplicate resumes (re-uploads, other formats) from this and past runs
+RATE_LIMIT_ENABLED = True  # Budget GPT calls by requests and tokens per minute and retry 429s (see ratelimit.py)
+OUTPUT_FORMAT = "json"  # "json": results.json at the end, "jsonl": append each result to RESULTS_JSONL_PATH as it finishes
+RESULTS_JSONL_PATH = "results.jsonl"
+PREPROCESS_ENABLED = True  # Compact resume text and send each prompt only the sections it needs
+PROMPT_TOKEN_BUDGET = 4000  # Upper bound on estimated resume tokens embedded in one prompt
+PRESCREEN_ENABLED = True  # Decide clear qualification passes/fails locally, before GPT
+PRESCREEN_AUDIT_RATE = 0.05  # Share of local decisions also sent to GPT to measure agreement
+METRICS_PATH = "metrics.json"  # Per-stage latency, token and cost summary of the last run
+RANKING_TOP_K = 0  # Keep only the best K candidates in ranking.json and prune evaluations that cannot reach them; 0 disables (see README for the cost per EVALUATION_MODE)
+RANKING_PATH = "ranking.json"
+
+# Speculative Evaluation Configuration
+SPECULATION_MODE = AUTO  # "on": evaluate criteria while GPT decides qualification, "off": only after, "auto": on while enough resumes qualify
+SPECULATION_MIN_QUALIFY_RATE = 0.6  # "auto" speculates while at least this share of GPT qualification checks pass
+SPECULATION_MIN_SAMPLES = 10  # GPT qualification checks observed before "auto" may speculate
+
+_result_cache = None
+_duplicate_index = None
+_speculation_executor = None
+_result_cache_lock = threading.Lock()
+prescreen_stats = PrescreenStats()
+cascade_stats = CascadeStats()
+speculation_policy = SpeculationPolicy()
+leaderboard = None  # Set by enable_ranking()
+
+# Shared keep-alive OpenAI and S3 clients, created on first use.
+# One pooled connection per concurrent resume, plus one for the S3 listing.
+transport.configure(
+    openai_api_key=OPENAI_API_KEY,
     aws_access_key_id="",
     aws_secret_access_key="",
-    region_name=""
+    region_name="",
+    pool_size=max(10, MAX_CONCURRENCY + 1)
 )
 
-# Static Examples
-EXAMPLES = [
-    {"criterion": "LLM Experience and Knowledge",
-     "example": "Built a chatbot for multiple PDFs and videos using LangChain, NLTK, and SpaCy, and deployed it via Streamlit.",
-     "score": 7,
-     "explanation": "Demonstrates advanced proficiency in working with LLMs, integrating them into applications, and deploying solutions effectively."},
-
-    {"criterion": "LLM Experience and Knowledge",
-     "example": "Made a project on Retrieval-Augmented Generation (RAG) development and Large Language Models (LLMs).",
-     "score": 9,
-     "explanation": "Shows theoretical knowledge and interest in state-of-the-art techniques but lacks practical project implementation."},
-
-    {"criterion": "LLM Experience and Knowledge",
-     "example": "Participated in academic research exploring applications of LLMs in education.",
-     "score": 5,
-     "explanation": "Limited scope of application and lacks substantial implementation experience."},
-
-    {"criterion": "LLM Experience and Knowledge",
-     "example": "Conducted a basic study of ChatGPT's capabilities for answering domain-specific queries.",
-     "score": 2,
-     "explanation": "Minimal hands-on work, focused more on exploration than implementation or deployment."},
-
-    {"criterion": "Good Institute (IIT or NIT)",
-     "example": "Student at one of the old IITs ",
-     "score": 10,
-     "explanation": "IIT is among the top institutions in India, reflecting strong academic credentials and a competitive environment."},
-
-    {"criterion": "Good Institute (IIT or NIT)",
-     "example": "Graduate from NIT Suratkal in Computer Science.",
-     "score": 8,
-     "explanation": "NIT Suratkal is a prestigious institution with a strong focus on technical education and research."},
-
-    {"criterion": "Good Institute (IIT or NIT)",
-     "example": "Student at a private engineering college with good regional reputation.",
-     "score": 6,
-     "explanation": "While the institution is not IIT/NIT, it is still reputable in a regional context."},
-
-    {"criterion": "Generative AI Experience",
-     "example": "Developed a virtual try-on system using GANs, PyTorch, and OpenCV.",
-     "score": 10,
-     "explanation": "Demonstrates expertise in Generative AI, leveraging advanced techniques for real-world applications."},
-
-    {"criterion": "Generative AI Experience",
-     "example": "Explored GAN-based image generation as part of an academic project.",
-     "score": 7,
-     "explanation": "Theoretical knowledge with limited practical experience in implementing and deploying systems."},
-
-    {"criterion": "Generative AI Experience",
-     "example": "Built a simple image generator using a pre-trained GAN model.",
-     "score": 5,
-     "explanation": "Basic implementation using pre-trained models without significant customization or original contributions."},
-
-    {"criterion": "Generative AI Experience",
-     "example": "Read research papers on diffusion models and GANs.",
-     "score": 3, 
-     "explanation": "Shows interest and theoretical knowledge but lacks hands-on experience."},
-
-    {"criterion": "Leadership and Teamwork", 
-     "example": "Led a team for a fraud detection model.", 
-     "score": 8, 
-     "explanation": "Proven leadership and teamwork skills."},
-
-    {"criterion": "Leadership and Teamwork", 
-     "example": "Organized a hackathon for 200 participants.", 
-     "score": 5, 
-     "explanation": "Moderate leadership experience."}
-]
+# Resume sections the qualification prompt needs (see preprocess.SECTION_HEADINGS);
+# each criterion's sections are in criteria.py.
+QUALIFICATION_SECTIONS = ("header", "summary", "experience")
 
 def extract_text_from_pdf(file_path):
     """
     Extract text content from PDF using PyPDF2.
-    Handles both regular text and table content.
+    Handles both regular text and table content. Parsing runs in the
+    extraction process pool and results are cached by file hash.
     """
     try:
-        text_content = []
         with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text_content.append(page.extract_text())
-        
-        # Join all pages with proper spacing
-        return '\n'.join(text_content)
+            return extract_text_from_bytes(file.read(), file_path)
     except Exception as e:
         logger.error(f"Error extracting text from PDF: {e}")
         raise
 
-def list_files_in_folder(bucket_name, folder_path):
-    """List all PDF files in the specified S3 folder."""
+def iter_files_in_folder(bucket_name, folder_path):
+    """
+    Yield resume files (PDF, DOCX, plain text and images to mark for OCR) in
+    the specified S3 folder, one listing page at a time.
+    Keys from the first page are available before the rest of the folder is listed.
+    """
     try:
-        response = s3.list_objects_v2(Bucket=bucket_name, Prefix=folder_path)
-        if "Contents" in response:
-            return [obj["Key"] for obj in response["Contents"] if obj["Key"].endswith(".pdf")]
-        return []
+        paginator = transport.get_s3_client().get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=folder_path):
+            for obj in page.get("Contents", []):
+                if obj["Key"].lower().endswith(SUPPORTED_EXTENSIONS):
+                    yield obj["Key"]
     except ClientError as e:
         logger.error(f"Error listing files in S3 bucket: {e}")
-        return []
+
+def list_files_in_folder(bucket_name, folder_path):
+    """List all resume files in the specified S3 folder."""
+    return list(iter_files_in_folder(bucket_name, folder_path))
 
 def download_resume_from_s3(bucket_name, resume_key, download_path="/tmp"):
     """Download resume from S3 to local temporary storage."""
     local_file_path = f"{download_path}/{resume_key.split('/')[-1]}"
     try:
-        s3.download_file(bucket_name, resume_key, local_file_path)
+        transport.get_s3_client().download_file(bucket_name, resume_key, local_file_path)
         return local_file_path
     except ClientError as e:
         logger.error(f"Error downloading file {resume_key}: {e}")
         raise
 
-def check_qualifying_criteria_with_gpt(resume_text):
-    """
-    Use GPT-4 to evaluate if the candidate meets qualifying criteria.
-    """
-    prompt = """
+def download_resume_to_memory(bucket_name, resume_key):
+    """Download resume from S3 into memory and return its bytes, without touching disk."""
+    try:
+        with metrics.stage("download"):
+            response = transport.get_s3_client().get_object(Bucket=bucket_name, Key=resume_key)
+            return response["Body"].read()
+    except ClientError as e:
+        logger.error(f"Error downloading file {resume_key}: {e}")
+        raise
+
+def get_result_cache():
+    """Return the shared on-disk result cache, or None when caching is disabled."""
+    global _result_cache
+    if not CACHE_ENABLED:
+        return None
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache()
+        return _result_cache
+
+def create_chat_completion(request):
+    """Send a chat completion through the shared client, within the rate limiter's budget when enabled."""
+    client = transport.get_openai_client()
+    if RATE_LIMIT_ENABLED:
+        return ratelimit.get_rate_limiter().create_chat_completion(client, request)
+    return client.chat.completions.create(**request)
+
+def get_duplicate_index():
+    """Return the shared near-duplicate index, or None when duplicate detection is disabled."""
+    global _duplicate_index
+    if not DEDUP_ENABLED:
+        return None
+    with _result_cache_lock:
+        if _duplicate_index is None:
+            _duplicate_index = DuplicateIndex()
+        return _duplicate_index
+
+def get_speculation_executor():
+    """Return the shared pool running speculative evaluations, created on first use."""
+    global _speculation_executor
+    with _result_cache_lock:
+        if _speculation_executor is None:
+            _speculation_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="speculative-evaluation")
+        return _speculation_executor
+
+def shutdown_speculation_executor():
+    """Wait for speculative evaluations still running (including discarded ones) and stop the pool."""
+    global _speculation_executor
+    with _result_cache_lock:
+        executor, _speculation_executor = _speculation_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+def model_options(model=None):
+    """Model, temperature and, for the fast tier, logprobs arguments of a chat completion request."""
+    model = model or GPT_MODEL
+    options = {"model": model, "temperature": MODEL_TEMPERATURES.get(model, 0.7)}
+    if model == FAST_MODEL:
+        options["logprobs"] = True  # Token probabilities are the cascade's confidence signal
+    return options
+
+QUALIFICATION_PROMPT = """
     Analyze the following resume and determine if the candidate meets these criteria:
     1. Has at least 2 years of relevant experience
     2. Has worked at a Tier 1 company (Google, Amazon, Microsoft, Meta, Apple)
@@ -143,123 +193,657 @@ def check_qualifying_criteria_with_gpt(resume_text):
     Resume Text:
     {resume_text}
     """
-    
+
+def build_qualification_request(resume_text, model=None):
+    """Chat completion arguments for the qualification check (by GPT_MODEL unless model is given)."""
+    return {
+        "messages": [
+            {"role": "system", "content": "You are an HR assistant evaluating resumes."},
+            {"role": "user", "content": QUALIFICATION_PROMPT.format(resume_text=resume_text)}
+        ],
+        **model_options(model)
+    }
+
+def parse_qualification(result):
+    """Simple heuristic: qualified if the word YES appears in the first line of the response."""
+    return "YES" in first_line_answers(result)
+
+def is_clear_answer(result):
+    """True if the first line of a qualification response says YES or NO as a word, and not both."""
+    return len(first_line_answers(result)) == 1
+
+def ask_qualification(resume_text, model=None):
+    """
+    Ask one model whether the candidate meets the qualifying criteria.
+    Returns (qualified, result, confidence); confidence is None unless the
+    model returned logprobs.
+    """
+    request = build_qualification_request(resume_text, model)
+
+    cache = get_result_cache()
+    cache_key = make_key("qualification", request["model"], content_hash(resume_text), content_hash(QUALIFICATION_PROMPT))
+    if cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached["qualified"], cached["result"], cached.get("confidence")
+
     try:
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)        
-        response = client.chat.completions.create(  # Updated method
-        model="gpt-4o",
-        messages=[
-                {"role": "system", "content": "You are an HR assistant evaluating resumes."},
-                {"role": "user", "content": prompt.format(resume_text=resume_text)}
-            ],
-        temperature=0.7
-        )
+        with metrics.stage("qualification"):
+            response = create_chat_completion(request)
+        metrics.record_usage(response)
         
         result = response.choices[0].message.content  # Updated attribute access
-        qualified = "YES" in result.split('\n')[0].upper()
-        return qualified, result
+        qualified = parse_qualification(result)
+        confidence = answer_confidence(response) if request.get("logprobs") else None
+        if cache:
+            cache.set(cache_key, {"qualified": qualified, "result": result, "confidence": confidence})
+        return qualified, result, confidence
     except Exception as e:
         logger.error(f"Error in GPT qualification check: {e}")
         raise
 
-def evaluate_resume_with_gpt(resume_text, criterion, weight):
+def check_qualifying_criteria_with_gpt(resume_text):
     """
-    Evaluate resume against specific criterion using GPT-4.
+    Use GPT to evaluate if the candidate meets qualifying criteria. With the
+    cascade enabled FAST_MODEL answers first, and GPT_MODEL only decides when
+    that answer is unclear or below QUALIFICATION_MIN_CONFIDENCE.
     """
-    examples_subset = [ex for ex in EXAMPLES if ex['criterion'] == criterion][:3]
-    examples_text = "\n".join(
+    if CASCADE_ENABLED:
+        qualified, result, confidence = ask_qualification(resume_text, FAST_MODEL)
+        settled = confidence is not None and confidence >= QUALIFICATION_MIN_CONFIDENCE and is_clear_answer(result)
+        cascade_stats.record("qualification", escalated=not settled)
+        if settled:
+            return qualified, result
+    qualified, result, _ = ask_qualification(resume_text, GPT_MODEL)
+    return qualified, result
+
+def build_examples_text(criterion):
+    """Format the few-shot examples the criteria registry holds for a criterion."""
+    examples_subset = criteria_registry.examples(criterion)
+    return "\n".join(
         f"Example {i+1}:\nCriterion: {ex['criterion']}\nResume: {ex['example']}\nScore: {ex['score']}\nExplanation: {ex['explanation']}"
         for i, ex in enumerate(examples_subset)
     )
 
-    prompt = f"""
-    You are an expert HR assistant evaluating resumes. Below is a candidate's resume and the criterion for evaluation:
+# Prompts put the static instructions, criteria and examples first and the resume last,
+# so every call for the same criteria starts with the same bytes and the API can serve
+# that prefix from its prompt cache (reported as cached tokens in metrics).
+EVALUATION_PROMPT = """
+    You are an expert HR assistant evaluating resumes. Below is the criterion for evaluation with examples of evaluation, followed by a candidate's resume:
 
     Criterion: {criterion}
     Weight: {weight}
 
-    ### Candidate's Resume:
-    {resume_text}
-
     ### Examples of Evaluation:
     {examples_text}
 
     Using the examples, evaluate the resume:
-    - Provide a single score (1-10).
     - Provide a justification for the score.
+    - End with a final line in exactly this form, with a single whole-number score from 0 to 10:
+    Score: <0-10>
+
+    ### Candidate's Resume:
+    {resume_text}
+    """
+
+def build_evaluation_request(resume_text, criterion, weight, model=None):
+    """Chat completion arguments for evaluating one criterion (by GPT_MODEL unless model is given)."""
+    prompt = EVALUATION_PROMPT.format(
+        criterion=criterion, weight=weight, examples_text=build_examples_text(criterion), resume_text=resume_text
+    )
+
+    return {
+        "messages": [
+            {"role": "system", "content": "You are an HR assistant."},
+            {"role": "user", "content": prompt}
+        ],
+        **model_options(model)
+    }
+
+def score_criterion(resume_text, criterion, weight, model=None):
+    """
+    Evaluate resume against one criterion with one model.
+    Returns (evaluation text, confidence in its score or None).
     """
+    request = build_evaluation_request(resume_text, criterion, weight, model)
+
+    cache = get_result_cache()
+    cache_key = make_key(
+        "evaluation", request["model"], criterion, content_hash(resume_text), content_hash(request["messages"][-1]["content"])
+    )
+    if cache:
+        cached = cache.get(cache_key)
+        if isinstance(cached, str):  # Stored before the cascade, without a confidence
+            return cached, None
+        if cached is not None:
+            return cached["result"], cached["confidence"]
     
     try:
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)  # And here
-        response = client.chat.completions.create(  # Updated method
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are an HR assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7
-        )
-        return response.choices[0].message.content  # Updated attribute access
+        with metrics.stage("evaluation"):
+            response = create_chat_completion(request)
+        metrics.record_usage(response)
+        result = response.choices[0].message.content  # Updated attribute access
+        confidence = text_score_confidence(response) if request.get("logprobs") else None
+        if cache and parse_score(result) is not None:  # Unscored results are retried, not reused
+            cache.set(cache_key, {"result": result, "confidence": confidence})
+        return result, confidence
     except Exception as e:
         logger.error(f"Error in GPT evaluation: {e}")
         raise
 
+def evaluate_resume_with_gpt(resume_text, criterion, weight):
+    """
+    Evaluate resume against specific criterion using GPT. With the cascade
+    enabled FAST_MODEL scores first and GPT_MODEL re-scores when the fast
+    score is missing or below SCORE_MIN_CONFIDENCE. A GPT_MODEL evaluation
+    without a score line is requested again, up to MAX_EVALUATION_RETRIES times;
+    the last one is returned even if it still has none.
+    """
+    if CASCADE_ENABLED:
+        result, confidence = score_criterion(resume_text, criterion, weight, FAST_MODEL)
+        settled = confidence is not None and confidence >= SCORE_MIN_CONFIDENCE and parse_score(result) is not None
+        cascade_stats.record("evaluation", escalated=not settled)
+        if settled:
+            return result
+    for attempt in range(MAX_EVALUATION_RETRIES + 1):
+        result, _ = score_criterion(resume_text, criterion, weight, GPT_MODEL)
+        if parse_score(result) is not None:
+            break
+        logger.warning(f"GPT evaluation of {criterion} has no score (attempt {attempt + 1})")
+    return result
+
+def parse_criteria_scores(response_text, criteria):
+    """
+    Parse the JSON returned by evaluate_all_criteria_with_gpt().
+    Only well-formed entries for the requested criteria are returned.
+    """
+    try:
+        entries = json.loads(response_text).get("evaluations", [])
+    except (json.JSONDecodeError, AttributeError) as e:
+        logger.warning(f"Could not parse GPT evaluation response: {e}")
+        return {}
+
+    scores = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict) or entry.get("criterion") not in criteria:
+            continue
+        score = entry.get("score")
+        justification = entry.get("justification")
+        if isinstance(score, bool) or not isinstance(score, (int, float)) or not 1 <= score <= 10:
+            continue
+        if not isinstance(justification, str) or not justification.strip():
+            continue
+        scores[entry["criterion"]] = {"score": score, "justification": justification.strip()}
+    return scores
+
+COMBINED_EVALUATION_PROMPT = """
+    You are an expert HR assistant evaluating resumes. Below are the criteria for evaluation, each with examples of evaluation, followed by a candidate's resume:
+
+    ### Criteria and Examples of Evaluation:
+    {criteria_text}
+
+    Using the examples, evaluate the resume against every criterion above.
+    Respond with JSON only, in the form:
+    {{"evaluations": [{{"criterion": "<criterion name exactly as given>", "score": <single score 1-10>, "justification": "<justification for the score>"}}]}}
+
+    ### Candidate's Resume:
+    {resume_text}
+    """
+
+def build_criterion_block(criterion, weight):
+    """Describe one criterion, its weight and its examples for the combined prompt."""
+    return f"Criterion: {criterion}\nWeight: {weight}\n{build_examples_text(criterion)}"
+
+def build_combined_evaluation_request(resume_text, criterion_blocks, model=None):
+    """Chat completion arguments for scoring several criteria in one call (by GPT_MODEL unless model is given)."""
+    prompt = COMBINED_EVALUATION_PROMPT.format(resume_text=resume_text, criteria_text="\n\n".join(criterion_blocks))
+    return {
+        "messages": [
+            {"role": "system", "content": "You are an HR assistant."},
+            {"role": "user", "content": prompt}
+        ],
+        **model_options(model),
+        "response_format": {"type": "json_object"}
+    }
+
+def score_all_criteria(resume_text, criteria_weights, model=None):
+    """
+    Evaluate resume against all criteria in a single call to one model.
+    Returns {criterion: {"score": ..., "justification": ..., "confidence": ...}},
+    where confidence is None unless the model returned logprobs. Criteria missing
+    from the response are requested again, up to MAX_EVALUATION_RETRIES times.
+    """
+    model = model or GPT_MODEL
+    criterion_blocks = {
+        criterion: build_criterion_block(criterion, weight)
+        for criterion, weight in criteria_weights.items()
+    }
+
+    # Criteria are cached one by one so changing one criterion only re-scores that one
+    cache = get_result_cache()
+    resume_hash = content_hash(resume_text)
+    template_hash = content_hash(COMBINED_EVALUATION_PROMPT)
+    cache_keys = {
+        criterion: make_key("evaluation", model, criterion, resume_hash, template_hash, content_hash(block))
+        for criterion, block in criterion_blocks.items()
+    }
+
+    results = {}
+    if cache:
+        for criterion, cache_key in cache_keys.items():
+            cached = cache.get(cache_key)
+            if cached is not None:
+                results[criterion] = cached
+    pending = {criterion: weight for criterion, weight in criteria_weights.items() if criterion not in results}
+
+    for attempt in range(MAX_EVALUATION_RETRIES + 1):
+        if not pending:
+            break
+
+        request = build_combined_evaluation_request(resume_text, [criterion_blocks[criterion] for criterion in pending], model)
+
+        try:
+            with metrics.stage("evaluation"):
+                response = create_chat_completion(request)
+            metrics.record_usage(response)
+        except Exception as e:
+            logger.error(f"Error in GPT evaluation: {e}")
+            raise
+
+        confidences = json_score_confidences(response) if request.get("logprobs") else {}
+        for criterion, evaluation in parse_criteria_scores(response.choices[0].message.content, pending).items():
+            evaluation["confidence"] = confidences.get(criterion)
+            results[criterion] = evaluation
+            if cache:
+                cache.set(cache_keys[criterion], evaluation)
+        pending = {criterion: weight for criterion, weight in pending.items() if criterion not in results}
+        if pending:
+            logger.warning(f"GPT evaluation missing criteria {sorted(pending)} (attempt {attempt + 1})")
+
+    if pending:
+        raise ValueError(f"GPT evaluation did not score criteria: {sorted(pending)}")
+    return results
+
+def evaluate_all_criteria_with_gpt(resume_text, criteria_weights):
+    """
+    Evaluate resume against all criteria in a single GPT call.
+    Returns {criterion: {"score": ..., "justification": ...}}. With the cascade
+    enabled FAST_MODEL scores every criterion first, and the criteria it scored
+    below SCORE_MIN_CONFIDENCE are re-scored together by GPT_MODEL.
+    """
+    if not CASCADE_ENABLED:
+        return score_all_criteria(resume_text, criteria_weights, GPT_MODEL)
+
+    results = score_all_criteria(resume_text, criteria_weights, FAST_MODEL)
+    uncertain = {
+        criterion: weight for criterion, weight in criteria_weights.items()
+        if results[criterion].get("confidence") is None or results[criterion]["confidence"] < SCORE_MIN_CONFIDENCE
+    }
+    for criterion in criteria_weights:
+        cascade_stats.record("evaluation", escalated=criterion in uncertain)
+    if uncertain:
+        results.update(score_all_criteria(resume_text, uncertain, GPT_MODEL))
+    return results
+
+def format_evaluation(evaluation):
+    """Render a structured evaluation in the same text form as evaluate_resume_with_gpt()."""
+    return f"### Score: {evaluation['score']}\n\n### Justification:\n{evaluation['justification']}"
+
+def prescreen_qualification(resume_text):
+    """
+    Run the local pre-screen. Returns (qualified, qualification_details) when
+    it is confident, or None when GPT has to decide.
+    """
+    decision, explanation = prescreen_resume(resume_text)
+    prescreen_stats.record(decision)
+    if decision is None:
+        return None
+    qualified = decision == PASS
+    return qualified, f"{'YES' if qualified else 'NO'}\n\nLocal pre-screen: {explanation}"
+
+def qualify_resume(qualification_text, local):
+    """
+    Check qualifying criteria, using the local pre-screen decision for clear
+    passes and fails (local, from prescreen_qualification()) and sending only
+    ambiguous resumes (local is None) to GPT. A sample of local decisions is
+    also checked by GPT to track agreement.
+    """
+    if local is None:
+        qualified, details = check_qualifying_criteria_with_gpt(qualification_text)
+        speculation_policy.record_qualification(qualified)
+        return qualified, details
+
+    qualified = local[0]
+    if random.random() < PRESCREEN_AUDIT_RATE:
+        gpt_qualified, _ = check_qualifying_criteria_with_gpt(qualification_text)
+        prescreen_stats.record_audit(gpt_qualified == qualified)
+        if gpt_qualified != qualified:
+            logger.warning(f"Pre-screen disagreed with GPT: {local[1]}")
+    return local
+
+def route_resume_text(resume_text, sections, wanted):
+    """
+    Return the resume text to embed in a prompt: only the wanted sections of the
+    compacted resume, within PROMPT_TOKEN_BUDGET. Returns resume_text unchanged
+    when preprocessing is disabled.
+    """
+    if not PREPROCESS_ENABLED:
+        return resume_text
+    return select_sections(sections, wanted, PROMPT_TOKEN_BUDGET)
+
+def get_criteria_weights():
+    """Criteria to evaluate, each with its weight, in the criteria registry's order."""
+    return criteria_registry.weights()
+
+def combined_sections(criteria):
+    """Sections a combined prompt needs: the union over its criteria, or None for the whole resume."""
+    sections = [criteria_registry.sections(criterion) for criterion in criteria]
+    if None in sections:
+        return None
+    return set().union(*sections)
+
+def evaluate_criteria(resume_text, sections, criteria_weights, cancelled=None):
+    """
+    Evaluate the resume against criteria_weights' criteria in EVALUATION_MODE.
+    Returns {criterion: evaluation text}. Per-criterion evaluation stops early
+    once the optional cancelled event is set.
+    """
+    evaluations = {}
+    if EVALUATION_MODE == "combined":
+        combined_text = route_resume_text(resume_text, sections, combined_sections(criteria_weights))
+        scores = evaluate_all_criteria_with_gpt(combined_text, criteria_weights)
+        for criterion in criteria_weights:
+            evaluations[criterion] = format_evaluation(scores[criterion])
+    else:
+        for criterion, weight in criteria_weights.items():
+            if cancelled is not None and cancelled.is_set():
+                break
+            criterion_text = route_resume_text(resume_text, sections, criteria_registry.sections(criterion))
+            evaluations[criterion] = evaluate_resume_with_gpt(criterion_text, criterion, weight)
+    return evaluations
+
 def process_resume(bucket_name, resume_key):
-    """Process a single resume through the evaluation pipeline."""
+    """
+    Process a single resume through the evaluation pipeline. The result includes
+    a "metrics" entry with stage timings, token counts and cost for this resume.
+    """
+    with metrics.track_resume() as resume_metrics:
+        result = run_resume_pipeline(bucket_name, resume_key)
+    result["metrics"] = resume_metrics.summary()
+    return result
+
+def enable_ranking(top_k):
+    """
+    Switch process_resume() to ranking mode with a fresh top-K leaderboard
+    (or back to scoring every criterion when top_k is 0). Returns the leaderboard.
+    """
+    global leaderboard
+    leaderboard = Leaderboard(top_k) if top_k else None
+    return leaderboard
+
+def evaluate_for_ranking(resume_key, resume_text, sections, criteria_weights):
+    """
+    Evaluate criteria highest weight first and stop as soon as the candidate's
+    best possible weighted total can no longer reach the leaderboard. In
+    "per_criterion" mode every criterion is one call, so pruning can stop after
+    any of them; in "combined" mode only the highest-weight criterion is scored
+    alone, and candidates that can still reach the board get the rest in one
+    combined call. Criteria whose evaluation has no score count as MAX_SCORE
+    for pruning, and the candidate is flagged for review instead of being
+    offered to the leaderboard. Fully scored candidates are offered to it.
+    Returns (evaluations, ranking details).
+    """
+    evaluations = {}
+    scores = {}
+    unscored = []
+    order = criteria_by_weight(criteria_weights)
+    for index, criterion in enumerate(order):
+        if not leaderboard.can_enter(upper_bound(scores, criteria_weights)):
+            break
+        if EVALUATION_MODE == "combined" and index > 0:
+            evaluations.update(evaluate_criteria(resume_text, sections, {name: criteria_weights[name] for name in order[index:]}))
+        else:
+            criterion_text = route_resume_text(resume_text, sections, criteria_registry.sections(criterion))
+            evaluations[criterion] = evaluate_resume_with_gpt(criterion_text, criterion, criteria_weights[criterion])
+        for name in evaluations.keys() - scores.keys() - set(unscored):
+            score = parse_score(evaluations[name])
+            if score is None:
+                logger.error(f"No score found in the {name} evaluation of {resume_key}; flagging it for review")
+                unscored.append(name)
+            else:
+                scores[name] = score
+        if len(evaluations) == len(criteria_weights):
+            break
+
+    skipped = [criterion for criterion in criteria_weights if criterion not in evaluations]
+    leaderboard.record(len(skipped))
+    ranking = {"weighted_score": sum(criteria_weights[criterion] * score for criterion, score in scores.items())}
+    if skipped:
+        ranking["pruned"] = True
+        ranking["upper_bound"] = upper_bound(scores, criteria_weights)
+        ranking["skipped_criteria"] = skipped
+    if unscored:
+        ranking["needs_review"] = True
+        ranking["unscored_criteria"] = sorted(unscored)
+    elif not skipped:
+        ranking["in_top_k"] = leaderboard.offer(resume_key, ranking["weighted_score"], scores)
+    return evaluations, ranking
+
+def rank_reused_result(result):
+    """Offer a fully evaluated result reused from a near-duplicate to the leaderboard."""
+    criteria_weights = get_criteria_weights()
+    evaluations = result.get("evaluations", {})
+    scores = {criterion: parse_score(evaluations.get(criterion)) for criterion in criteria_weights}
+    if result["status"] != "Qualified" or None in scores.values():
+        return
+    total = sum(criteria_weights[criterion] * score for criterion, score in scores.items())
+    leaderboard.record(0)
+    result["ranking"] = {"weighted_score": total, "in_top_k": leaderboard.offer(result["resume_key"], total, scores)}
+
+def scoring_context():
+    """Key for what a stored result depends on besides the resume: models, evaluation mode and criterion versions."""
+    return make_key(GPT_MODEL, CASCADE_ENABLED and FAST_MODEL, EVALUATION_MODE, sorted(criteria_registry.versions().items()))
+
+def reuse_duplicate_result(resume_key, resume_text, duplicate):
+    """Build this resume's result from the result of its near-duplicate."""
+    logger.info(f"{resume_key} is a near-duplicate of {duplicate['resume_key']} (similarity {duplicate['similarity']})")
+    result = {"resume_key": resume_key, **duplicate["result"]}
+    if result["status"] == "Qualified":
+        result["resume_text"] = resume_text
+    result["duplicate_of"] = {name: value for name, value in duplicate.items() if name != "result"}
+    if leaderboard is not None:
+        rank_reused_result(result)
+    return result
+
+def run_resume_pipeline(bucket_name, resume_key):
+    """Download, extract, qualify and evaluate one resume."""
     try:
-        # Download and extract text from PDF
-        local_file_path = download_resume_from_s3(bucket_name, resume_key)
-        resume_text = extract_text_from_pdf(local_file_path)
+        # Download and extract text from the PDF, DOCX or text file
+        resume_bytes = download_resume_to_memory(bucket_name, resume_key)
+        with metrics.stage("extract"):
+            resume_text = extract_text_from_bytes(resume_bytes, resume_key)
+
+        # Reuse the result of an earlier upload of (nearly) the same resume
+        duplicate_index = get_duplicate_index()
+        if duplicate_index:
+            with metrics.stage("dedup"):
+                signature = minhash(resume_text)
+                duplicate = duplicate_index.find(resume_key, resume_text, signature, scoring_context())
+            if duplicate:
+                return reuse_duplicate_result(resume_key, resume_text, duplicate)
+
+        sections = split_sections(compact_resume_text(resume_text)) if PREPROCESS_ENABLED else None
+        criteria_weights = get_criteria_weights()
+        local = prescreen_qualification(resume_text) if PRESCREEN_ENABLED else None
+
+        # Evaluate while GPT decides qualification when enough resumes qualify to make it pay;
+        # ranking mode prunes evaluations using earlier scores, so it never speculates
+        speculation = None
+        if local is None and leaderboard is None and speculation_policy.should_speculate(
+            SPECULATION_MODE, SPECULATION_MIN_QUALIFY_RATE, SPECULATION_MIN_SAMPLES
+        ):
+            speculation = SpeculativeTask(get_speculation_executor(), evaluate_criteria, resume_text, sections, criteria_weights)
+            speculation_policy.record_started()
         
         # Check qualifying criteria
-        qualified, qualification_details = check_qualifying_criteria_with_gpt(resume_text)
+        try:
+            qualified, qualification_details = qualify_resume(
+                route_resume_text(resume_text, sections, QUALIFICATION_SECTIONS), local
+            )
+        except Exception:
+            if speculation:
+                speculation.discard(speculation_policy.record_discarded)
+            raise
+        if speculation and not qualified:
+            speculation.discard(speculation_policy.record_discarded)
         
         if qualified:
             # Evaluate against all criteria
-            evaluations = {}
-            for criterion in set(ex["criterion"] for ex in EXAMPLES):
-                weight = 10  # Default weight
-                result = evaluate_resume_with_gpt(resume_text, criterion, weight)
-                evaluations[criterion] = result
+            ranking = None
+            if leaderboard is not None:
+                evaluations, ranking = evaluate_for_ranking(resume_key, resume_text, sections, criteria_weights)
+            elif speculation:
+                evaluations, saved_seconds = speculation.result()
+                speculation_policy.record_used(saved_seconds)
+            else:
+                evaluations = evaluate_criteria(resume_text, sections, criteria_weights)
             
-            return {
+            result = {
                 "resume_key": resume_key,
                 "status": "Qualified",
                 "qualification_details": qualification_details,
                 "evaluations": evaluations,
+                # Lets reevaluate.py redo only the criteria whose definition changed since
+                "criteria_versions": criteria_registry.versions(evaluations),
                 "resume_text": resume_text
             }
+            if ranking:
+                result["ranking"] = ranking
         else:
-            return {
+            result = {
                 "resume_key": resume_key,
                 "status": "Not Qualified",
                 "qualification_details": qualification_details
             }
-            
+
+        # Pruned results are incomplete and only pruned relative to this run's leaderboard
+        if duplicate_index and not result.get("ranking", {}).get("pruned"):
+            stored = {name: value for name, value in result.items() if name not in ("resume_key", "resume_text", "ranking")}
+            duplicate_index.add(resume_key, resume_text, signature, scoring_context(), stored)
+        return result
+
+    except UnreadableResumeError as e:
+        # Scanned, image-only or encrypted documents are flagged for OCR or review instead of being scored
+        logger.warning(f"Resume {resume_key} needs OCR or manual review: {e}")
+        return {"resume_key": resume_key, "status": "Unreadable", "reason": str(e)}
     except Exception as e:
         logger.error(f"Error processing resume {resume_key}: {e}")
         return {"resume_key": resume_key, "error": str(e)}
-    
+
+async def stream_resumes_async(bucket_name, resume_keys, on_result, max_concurrency=MAX_CONCURRENCY):
+    """
+    Run process_resume() for many resumes at once, at most max_concurrency at a time,
+    calling on_result(index, result) as each one finishes. resume_keys may be a lazy
+    iterable such as iter_files_in_folder(); processing starts as soon as the first
+    key arrives, and only in-flight resumes are held in memory.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    keys = iter(resume_keys)
+    in_flight = set()
+
+    # One extra worker so the listing can advance while every resume slot is busy
+    with ThreadPoolExecutor(max_workers=max_concurrency + 1) as executor:
+        async def run(index, resume_key):
+            try:
+                logger.info(f"Processing {resume_key}...")
+                result = await loop.run_in_executor(executor, process_resume, bucket_name, resume_key)
+                on_result(index, result)
+            finally:
+                semaphore.release()
+
+        index = 0
+        while True:
+            resume_key = await loop.run_in_executor(executor, next, keys, None)
+            if resume_key is None:
+                break
+            await semaphore.acquire()
+            task = asyncio.create_task(run(index, resume_key))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            index += 1
+
+        if in_flight:
+            await asyncio.gather(*in_flight)
+
+async def process_resumes_async(bucket_name, resume_keys, max_concurrency=MAX_CONCURRENCY):
+    """
+    Run process_resume() for many resumes at once, at most max_concurrency at a time.
+    Results are returned in the same order as resume_keys.
+    """
+    results = {}
+
+    def collect(index, result):
+        results[index] = result
+
+    await stream_resumes_async(bucket_name, resume_keys, collect, max_concurrency)
+    return [results[index] for index in range(len(results))]
+
+def process_resumes_to_jsonl(bucket_name, resume_keys, results_path=RESULTS_JSONL_PATH, max_concurrency=MAX_CONCURRENCY):
+    """
+    Process resumes and append each result to results_path as soon as it finishes.
+    Keys that already completed in results_path are skipped, so an interrupted
+    batch can simply be restarted. Returns the number of results written.
+    """
+    with JsonlResultsWriter(results_path) as writer:
+        completed = writer.completed_keys()
+        if completed:
+            logger.info(f"Skipping {len(completed)} resumes already completed in {results_path}")
+        pending_keys = (resume_key for resume_key in resume_keys if resume_key not in completed)
+
+        def write(index, result):
+            writer.write(result)
+            print(f"{result['resume_key']}: {result.get('status', 'Error')}")
+
+        if max_concurrency > 1:
+            asyncio.run(stream_resumes_async(bucket_name, pending_keys, write, max_concurrency))
+        else:
+            for index, resume_key in enumerate(pending_keys):
+                write(index, process_resume(bucket_name, resume_key))
+        return writer.count
+
 def main():
     """Main function for local execution"""
     try:
         # Configuration - modify these as needed
         bucket_name = "hm-video-audio-bucket"
         folder_path = "resumes/77KFnlghWUnWhYG/"  # Example folder path
+        enable_ranking(RANKING_TOP_K)
         
-        # Get list of PDF files in S3 folder
-        resume_keys = list_files_in_folder(bucket_name, folder_path)
-        if not resume_keys:
-            print(f"No resumes found in {bucket_name}/{folder_path}")
+        # List PDF files in S3 folder lazily, page by page
+        resume_keys = iter_files_in_folder(bucket_name, folder_path)
+
+        if OUTPUT_FORMAT == "jsonl":
+            count = process_resumes_to_jsonl(bucket_name, resume_keys, RESULTS_JSONL_PATH, MAX_CONCURRENCY)
+            print(f"\nProcessing complete. {count} new results appended to {RESULTS_JSONL_PATH}")
             return
 
         # Process all resumes
-        results = []
-        for resume_key in resume_keys:
-            print(f"\nProcessing {resume_key}...")
-            result = process_resume(bucket_name, resume_key)
-            results.append(result)
-            print(json.dumps(result, indent=2))
+        if MAX_CONCURRENCY > 1:
+            results = asyncio.run(process_resumes_async(bucket_name, resume_keys, MAX_CONCURRENCY))
+            for result in results:
+                print(json.dumps(result, indent=2))
+        else:
+            results = []
+            for resume_key in resume_keys:
+                print(f"\nProcessing {resume_key}...")
+                result = process_resume(bucket_name, resume_key)
+                results.append(result)
+                print(json.dumps(result, indent=2))
+
+        if not results:
+            print(f"No resumes found in {bucket_name}/{folder_path}")
+            return
 
         # Save final results
         with open("results.json", "w") as f:
@@ -270,6 +854,24 @@ def main():
     except Exception as e:
         logger.error(f"Error occurred: {e}")
         raise
+    finally:
+        shutdown_speculation_executor()
+        if PRESCREEN_ENABLED:
+            logger.info(f"Pre-screen summary: {json.dumps(prescreen_stats.report())}")
+        if leaderboard is not None:
+            with open(RANKING_PATH, "w") as f:
+                json.dump({"summary": leaderboard.report(), "top": leaderboard.top()}, f, indent=2)
+            logger.info(f"Top {RANKING_TOP_K} candidates saved to {RANKING_PATH}: {json.dumps(leaderboard.report())}")
+        if CASCADE_ENABLED:
+            logger.info(f"Model cascade summary: {json.dumps(cascade_stats.report())}")
+        if SPECULATION_MODE != OFF:
+            logger.info(f"Speculative evaluation summary: {json.dumps(speculation_policy.report())}")
+        if RATE_LIMIT_ENABLED:
+            logger.info(f"Rate limiter summary: {json.dumps(ratelimit.get_rate_limiter().report())}")
+        metrics.batch_metrics.export(METRICS_PATH)
+        logger.info(f"Run summary (saved to {METRICS_PATH}): {json.dumps(metrics.batch_metrics.report())}")
+        transport.close_clients()
+        shutdown_extraction_pool()
 
 if __name__ == "__main__":
     # Create temporary directory if it doesn't exist
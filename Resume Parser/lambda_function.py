@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+import time
+import metrics
+
+_INIT_STARTED = time.perf_counter()
+
+# Logging Configuration
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Lambda Configuration
+BUCKET_NAME = os.environ.get("RESUME_BUCKET", "hm-video-audio-bucket")
+MAX_CONCURRENCY = int(os.environ.get("MAX_CONCURRENCY", "8"))
+CACHE_DIR = "/tmp/cache"  # /tmp is the only writable path and survives warm invocations
+
+_pipeline = None
+_invocations = 0
+
+def get_pipeline():
+    """
+    Import and configure the pipeline on first use. The heavy imports (openai,
+    boto3, PyPDF2) are deferred further, to the first client or parser use.
+    Warm invocations reuse the module, its pooled clients and its caches.
+    """
+    global _pipeline
+    if _pipeline is None:
+        import asyncio
+        import cache
+        import dedup
+        import extraction
+        import gpt
+        import ratelimit
+        import transport
+
+        cache.CACHE_PATH = os.path.join(CACHE_DIR, "results.sqlite3")
+        extraction.TEXT_CACHE_PATH = os.path.join(CACHE_DIR, "text.sqlite3")
+        dedup.DEDUP_PATH = os.path.join(CACHE_DIR, "dedup.sqlite3")
+        ratelimit.STATE_PATH = os.path.join(CACHE_DIR, "ratelimit.json")
+        extraction.EXTRACTION_WORKERS = 0  # Lambda has no /dev/shm, which process pools need
+        transport.configure(
+            openai_api_key=os.environ.get("OPENAI_API_KEY") or gpt.OPENAI_API_KEY,
+            pool_size=max(10, MAX_CONCURRENCY + 1)
+        )
+
+        def run(folder_path):
+            resume_keys = gpt.iter_files_in_folder(BUCKET_NAME, folder_path)
+            return asyncio.run(gpt.process_resumes_async(BUCKET_NAME, resume_keys, MAX_CONCURRENCY))
+
+        _pipeline = run
+    return _pipeline
+
+def parse_folder_path(event):
+    """Return the requested folder from an API Gateway or direct-invoke event, or None."""
+    body = event.get("body", event)
+    if isinstance(body, str):
+        try:
+            body = json.loads(body)
+        except json.JSONDecodeError:
+            return None
+    folder_path = body.get("folder_path") if isinstance(body, dict) else None
+    if not folder_path:
+        return None
+    # Replace backslashes with forward slashes
+    return folder_path.replace("\\", "/")
+
+def response(status_code, body):
+    return {"statusCode": status_code, "body": json.dumps(body, indent=4)}
+
+def lambda_handler(event, context):
+    """AWS Lambda handler function."""
+    global _invocations
+    handler_started = time.perf_counter()
+    _invocations += 1
+    timings = {"cold_start": _invocations == 1, "init_seconds": round(INIT_SECONDS, 3) if _invocations == 1 else 0.0}
+
+    try:
+        folder_path = parse_folder_path(event)
+        if not folder_path:
+            return response(400, {"error": "No folder path provided."})
+
+        pipeline_started = time.perf_counter()
+        run = get_pipeline()
+        timings["pipeline_init_seconds"] = round(time.perf_counter() - pipeline_started, 3)
+
+        metrics.batch_metrics.reset()
+        results = run(folder_path)
+        if not results:
+            return response(404, {"error": f"No resumes found in the specified folder: {folder_path}"})
+        return response(200, {"results": results, "metrics": metrics.batch_metrics.report()})
+    except Exception as e:
+        logger.error(f"Error occurred: {e}")
+        return response(500, {"error": str(e)})
+    finally:
+        timings["handler_seconds"] = round(time.perf_counter() - handler_started, 3)
+        logger.info(f"Invocation timings: {json.dumps(timings)}")
+
+INIT_SECONDS = time.perf_counter() - _INIT_STARTED
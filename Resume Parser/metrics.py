@@ -0,0 +1,232 @@
+import contextvars
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# OpenAI GPT-4 Pricing
+PROMPT_COST_PER_1000_TOKENS = 0.0025
+COMPLETION_COST_PER_1000_TOKENS = 0.01
+
+# Per-model (prompt, completion) USD per 1000 tokens; models are matched by longest prefix
+MODEL_PRICING = {
+    "gpt-4o": (PROMPT_COST_PER_1000_TOKENS, COMPLETION_COST_PER_1000_TOKENS),
+    "gpt-4o-mini": (0.00015, 0.0006)
+}
+CACHED_PROMPT_PRICE_FACTOR = 0.5  # Prompt tokens served from the API's prompt cache are billed at this share of the prompt price
+
+_current_resume = contextvars.ContextVar("current_resume", default=None)
+_current_spend = contextvars.ContextVar("current_spend", default=None)
+_current_batch = contextvars.ContextVar("current_batch", default=None)
+
+def call_cost(model, prompt_tokens, completion_tokens, cached_prompt_tokens=0):
+    """USD cost of one call, using the longest MODEL_PRICING prefix that matches model."""
+    matches = [name for name in MODEL_PRICING if (model or "").startswith(name)]
+    prompt_price, completion_price = MODEL_PRICING[max(matches, key=len)] if matches else MODEL_PRICING["gpt-4o"]
+    billed_prompt_tokens = prompt_tokens - cached_prompt_tokens * (1 - CACHED_PROMPT_PRICE_FACTOR)
+    return billed_prompt_tokens / 1000 * prompt_price + completion_tokens / 1000 * completion_price
+
+def cache_hit_rate(cached_prompt_tokens, prompt_tokens):
+    """Share of prompt tokens served from the API's prompt cache (None without prompt tokens)."""
+    return round(cached_prompt_tokens / prompt_tokens, 3) if prompt_tokens else None
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+class ResumeMetrics:
+    """Stage timings and GPT usage for one resume (updated from several threads when evaluations are speculative)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage_seconds = {}
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.calls = 0
+        self.call_usage = []  # Per call: model, prompt, cached prompt and completion tokens
+
+    def summary(self):
+        return {
+            "stage_seconds": {stage: round(seconds, 3) for stage, seconds in self.stage_seconds.items()},
+            "gpt_calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "gpt_call_usage": self.call_usage
+        }
+
+class Spend:
+    """GPT calls and cost of one group of calls, such as a resume's speculative evaluations."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.cost_usd = 0.0
+
+    def add(self, cost):
+        with self._lock:
+            self.calls += 1
+            self.cost_usd += cost
+
+class BatchMetrics:
+    """Thread-safe latency, token and cost totals for a whole batch."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stage_latencies = {}
+            self.resumes = 0
+            self.calls = 0
+            self.prompt_tokens = 0
+            self.cached_prompt_tokens = 0
+            self.completion_tokens = 0
+            self.cost_usd = 0.0
+            self.started_at = None
+            self.finished_at = None
+
+    def record_stage(self, stage, seconds):
+        with self._lock:
+            self.stage_latencies.setdefault(stage, []).append(seconds)
+
+    def record_call(self, prompt_tokens, completion_tokens, cost, cached_prompt_tokens=0):
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.cached_prompt_tokens += cached_prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cost_usd += cost
+
+    def resume_started(self):
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.time()
+
+    def resume_finished(self):
+        with self._lock:
+            self.resumes += 1
+            self.finished_at = time.time()
+
+    def report(self):
+        """Summary with p50/p95 latency per stage, throughput, tokens, prompt cache hits and cost."""
+        with self._lock:
+            elapsed = (self.finished_at - self.started_at) if self.started_at and self.finished_at else 0.0
+            return {
+                "resumes": self.resumes,
+                "elapsed_seconds": round(elapsed, 3),
+                "resumes_per_minute": round(self.resumes / elapsed * 60, 2) if elapsed else None,
+                "stages": {
+                    stage: {
+                        "count": len(latencies),
+                        "p50_seconds": round(percentile(latencies, 0.50), 3),
+                        "p95_seconds": round(percentile(latencies, 0.95), 3),
+                        "total_seconds": round(sum(latencies), 3)
+                    }
+                    for stage, latencies in self.stage_latencies.items()
+                },
+                "gpt_calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_prompt_tokens": self.cached_prompt_tokens,
+                "prompt_cache_hit_rate": cache_hit_rate(self.cached_prompt_tokens, self.prompt_tokens),
+                "completion_tokens": self.completion_tokens,
+                "cost_usd": round(self.cost_usd, 6)
+            }
+
+    def export(self, path):
+        """Write report() to a JSON file so runs can be compared."""
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+batch_metrics = BatchMetrics()
+
+def current_batch():
+    """The BatchMetrics of this context: the one set by track_batch(), otherwise batch_metrics."""
+    return _current_batch.get() or batch_metrics
+
+@contextmanager
+def track_batch(collector):
+    """Record the batch-level metrics of work done in this context in collector instead of batch_metrics."""
+    token = _current_batch.set(collector)
+    try:
+        yield collector
+    finally:
+        _current_batch.reset(token)
+
+@contextmanager
+def track_resume():
+    """Collect metrics for the resume processed in this context; yields its ResumeMetrics."""
+    resume_metrics = ResumeMetrics()
+    batch = current_batch()
+    token = _current_resume.set(resume_metrics)
+    batch.resume_started()
+    started = time.perf_counter()
+    try:
+        yield resume_metrics
+    finally:
+        seconds = time.perf_counter() - started
+        resume_metrics.stage_seconds["total"] = seconds
+        batch.record_stage("total", seconds)
+        batch.resume_finished()
+        _current_resume.reset(token)
+
+@contextmanager
+def stage(name):
+    """Time a pipeline stage for the current resume and the batch."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        current_batch().record_stage(name, seconds)
+        resume_metrics = _current_resume.get()
+        if resume_metrics is not None:
+            with resume_metrics._lock:
+                resume_metrics.stage_seconds[name] = resume_metrics.stage_seconds.get(name, 0.0) + seconds
+
+@contextmanager
+def track_spend(spend):
+    """Also add the cost of GPT calls made in this context to spend."""
+    token = _current_spend.set(spend)
+    try:
+        yield spend
+    finally:
+        _current_spend.reset(token)
+
+def record_usage(response):
+    """Record prompt (and prompt-cached), completion tokens and cost from a chat completion response."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    model = getattr(response, "model", None)
+    prompt_tokens = usage.prompt_tokens or 0
+    cached_prompt_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None) or 0
+    completion_tokens = usage.completion_tokens or 0
+    cost = call_cost(model, prompt_tokens, completion_tokens, cached_prompt_tokens)
+    current_batch().record_call(prompt_tokens, completion_tokens, cost, cached_prompt_tokens)
+    spend = _current_spend.get()
+    if spend is not None:
+        spend.add(cost)
+    resume_metrics = _current_resume.get()
+    if resume_metrics is None:
+        return
+    with resume_metrics._lock:
+        resume_metrics.calls += 1
+        resume_metrics.prompt_tokens += prompt_tokens
+        resume_metrics.cached_prompt_tokens += cached_prompt_tokens
+        resume_metrics.completion_tokens += completion_tokens
+        resume_metrics.cost_usd += cost
+        resume_metrics.call_usage.append({
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "cached_prompt_tokens": cached_prompt_tokens,
+            "completion_tokens": completion_tokens
+        })
@@ -0,0 +1,71 @@
+import json
+import logging
+import os
+import threading
+
+# Logging Configuration
+logger = logging.getLogger(__name__)
+
+class JsonlResultsWriter:
+    """
+    Append per-resume result dicts to a JSON Lines file as they complete.
+    Every line is flushed and fsynced, so a crash loses at most the line being
+    written. Use as a context manager.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = None
+
+    def __enter__(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._drop_partial_line()
+        self._file = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _drop_partial_line(self):
+        """Truncate a trailing line left half-written by an interrupted run."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+                logger.warning(f"Dropped incomplete last line of {self.path}")
+
+    def completed_keys(self):
+        """Return resume keys that already have a successful result in the file."""
+        completed = set()
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                # Errored resumes are retried on the next run
+                if "error" not in result and "resume_key" in result:
+                    completed.add(result["resume_key"])
+        return completed
+
+    def write(self, result):
+        """Append one result and flush it to disk."""
+        with self._lock:
+            self._file.write(json.dumps(result, ensure_ascii=False) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,190 @@
+import re
+import unicodedata
+from collections import Counter
+
+# Glyphs some PDF fonts emit for ligatures, with the letters they stand for.
+# The broken ligature is often preceded by a stray space ("Ins Ɵtute").
+LIGATURES = {"Ɵ": "ti", "Ʃ": "tt", "Ō": "ft"}
+BULLETS = "•◦▪■●►▸➢✓✔❖∙"
+PAGE_BREAK = "\f"  # Between pages in extracted text (extraction.extract_document())
+PAGE_EDGE_LINES = 3  # Lines at the top and at the bottom of a page where running headers/footers sit
+
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(\.[\w-]+)+")
+# A "+" country code and at least 8 more digits, or at least 10 digits after an optional code; groups are
+# joined by at most one space or hyphen, so lines, dates and year ranges ("2019 - 2021") do not match
+PHONE_PATTERN = re.compile(
+    r"(?:(?<![\d+/.])\+\d{1,3}[ -]{0,2}\d(?:[ -]?\d){7,13}|(?<![\w+/.])(?:\d{1,3}[ -]{1,2})?\d(?:[ -]?\d){9,13})(?![\w/.])"
+)
+YEARS_PATTERN = re.compile(r"(?:19|20)\d\d(?:[ -](?:19|20)\d\d)*")  # "2018-2022", "2019 2020 2021" are not phones
+LINKEDIN_PATTERN = re.compile(r"(https?://)?(www\.)?linkedin\.com/\S*", re.IGNORECASE)
+PAGE_NUMBER_PATTERN = re.compile(r"^(page\s*)?\d{1,2}(\s*(of|/)\s*\d{1,2})?$", re.IGNORECASE)
+
+# Heading text (lowercase, letters only) -> canonical section name
+SECTION_HEADINGS = {
+    "education": "education",
+    "educational qualifications": "education",
+    "academic details": "education",
+    "academic qualifications": "education",
+    "academics": "education",
+    "qualifications": "education",
+    "experience": "experience",
+    "work experience": "experience",
+    "professional experience": "experience",
+    "relevant experience": "experience",
+    "internship experience": "experience",
+    "internships": "experience",
+    "internship": "experience",
+    "employment": "experience",
+    "employment history": "experience",
+    "work history": "experience",
+    "projects": "projects",
+    "key projects": "projects",
+    "academic projects": "projects",
+    "personal projects": "projects",
+    "research projects": "projects",
+    "research project": "projects",
+    "research": "projects",
+    "positions of responsibility": "leadership",
+    "position of responsibility": "leadership",
+    "leadership": "leadership",
+    "leadership experience": "leadership",
+    "extracurricular activities": "leadership",
+    "extra curricular activities": "leadership",
+    "extracurriculars": "leadership",
+    "extracurricular": "leadership",
+    "activities": "leadership",
+    "volunteering": "leadership",
+    "skills": "skills",
+    "technical skills": "skills",
+    "key skills": "skills",
+    "summary": "summary",
+    "profile": "summary",
+    "profile summary": "summary",
+    "professional summary": "summary",
+    "objective": "summary",
+    "career objective": "summary",
+    "about me": "summary",
+    "achievements": "achievements",
+    "scholastic achievements": "achievements",
+    "awards": "achievements",
+    "honors and awards": "achievements",
+    "certifications": "achievements",
+    "certifications courses": "achievements",
+    "publications": "achievements",
+    "courses": "achievements",
+    "key courses": "achievements",
+    "coursework": "achievements",
+    "relevant coursework": "achievements",
+}
+
+def estimate_tokens(text):
+    """Rough local token count (about four characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+def _remove_phone(match):
+    return match.group() if YEARS_PATTERN.fullmatch(match.group()) else ""
+
+def _page_edges(lines):
+    return set(range(min(PAGE_EDGE_LINES, len(lines)))) | set(range(max(0, len(lines) - PAGE_EDGE_LINES), len(lines)))
+
+def remove_running_headers(pages):
+    """
+    Drop lines that sit at the top or bottom of more than one page (running
+    headers and footers), keeping their first occurrence. Repeated lines in the
+    body of a page, such as a second role with the same title, are kept.
+    """
+    edge_counts = Counter()
+    for lines in pages:
+        edge_counts.update({lines[index] for index in _page_edges(lines)})
+    seen = set()
+    kept = []
+    for lines in pages:
+        edges = _page_edges(lines)
+        for index, line in enumerate(lines):
+            if index in edges and edge_counts[line] > 1:
+                if line in seen:
+                    continue
+                seen.add(line)
+            kept.append(line)
+    return kept
+
+def compact_resume_text(text):
+    """
+    Normalise extracted resume text without changing its content: repair broken
+    ligatures and hyphenation, drop page numbers, contact boilerplate and lines
+    repeated by page headers/footers, and collapse whitespace.
+    """
+    text = unicodedata.normalize("NFKC", text)
+    for glyph, letters in LIGATURES.items():
+        text = re.sub(f" ?{glyph}", letters, text)
+    text = re.sub(r"([a-z])-\n([a-z])", r"\1\2", text)
+    text = EMAIL_PATTERN.sub("", text)
+    text = LINKEDIN_PATTERN.sub("", text)
+    text = PHONE_PATTERN.sub(_remove_phone, text)
+
+    pages = []
+    for page in text.split(PAGE_BREAK):
+        lines = []
+        for line in page.splitlines():
+            line = "".join(
+                "-" if ch in BULLETS else ch
+                for ch in line
+                if ch in BULLETS or unicodedata.category(ch) not in ("So", "Co")  # Icons and icon-font glyphs
+            )
+            line = re.sub(r"\s+", " ", line).strip(" |;,")
+            if not re.search(r"\w", line) or PAGE_NUMBER_PATTERN.match(line):
+                continue
+            lines.append(line)
+        pages.append(lines)
+    return "\n".join(remove_running_headers(pages))
+
+def _heading_section(line):
+    key = re.sub(r"[^a-z ]", " ", line.lower())
+    key = re.sub(r"\s+", " ", key).strip()
+    return SECTION_HEADINGS.get(key)
+
+def split_sections(text):
+    """
+    Split resume text into (section, text) pairs in document order. Text before
+    the first recognised heading is returned as the "header" section.
+    """
+    sections = []
+    current, current_lines = "header", []
+    for line in text.splitlines():
+        section = _heading_section(line) if len(line) <= 40 else None
+        if section:
+            if current_lines:
+                sections.append((current, "\n".join(current_lines)))
+            current, current_lines = section, [line]
+        else:
+            current_lines.append(line)
+    if current_lines:
+        sections.append((current, "\n".join(current_lines)))
+    return sections
+
+def truncate_to_budget(text, max_tokens):
+    """Cut text at a line boundary so that estimate_tokens() stays within max_tokens."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    kept, used = [], 0
+    for line in text.splitlines():
+        cost = estimate_tokens(line + "\n")
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+def select_sections(sections, wanted, max_tokens):
+    """
+    Join the sections named in wanted, in document order, within max_tokens.
+    Falls back to the whole resume when no wanted section is found, so a
+    resume with unusual headings is never sent empty.
+    """
+    if wanted is None or len({name for name, _ in sections} - {"header"}) == 0:
+        selected = [body for _, body in sections]
+    else:
+        selected = [body for name, body in sections if name in wanted]
+        if not [name for name, _ in sections if name in wanted and name != "header"]:
+            selected = [body for _, body in sections]
+    return truncate_to_budget("\n".join(selected), max_tokens)
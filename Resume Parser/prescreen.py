@@ -0,0 +1,184 @@
+import datetime
+import re
+import threading
+from preprocess import compact_resume_text, split_sections
+
+# Pre-screen Configuration
+# Names that count as a mention of a Tier 1 company, including subsidiaries and brands, so none is failed locally
+TIER1_COMPANIES = {
+    "Google": ("google", "alphabet", "deepmind", "youtube", "waymo", "fitbit"),
+    "Amazon": ("amazon", "aws", "audible", "twitch", "zappos"),
+    "Microsoft": ("microsoft", "linkedin", "github"),
+    "Meta": ("meta", "facebook", "instagram", "whatsapp", "oculus"),
+    "Apple": ("apple",)
+}
+# Aliases that name the company as an employer; "aws" and "alphabet" mostly name products or the holding company,
+# and subsidiaries are left for GPT to judge
+EMPLOYER_ALIASES = {
+    "Google": ("google",),
+    "Amazon": ("amazon",),
+    "Microsoft": ("microsoft",),
+    "Meta": ("meta", "facebook"),
+    "Apple": ("apple",)
+}
+# Words that make a Tier 1 name a product or tool ("Google Cloud", "Microsoft Azure", "Apple Core ML")
+PRODUCT_WORDS = (
+    "cloud", "azure", "teams", "office", "excel", "word", "powerpoint", "outlook", "sql", "dynamics", "power",
+    "ads", "analytics", "maps", "firebase", "colab", "play", "pay", "workspace", "sheets", "search console",
+    "web services", "lambda", "s3", "ec2", "sagemaker", "alexa", "core", "swift", "watch", "music", "store",
+    "ios", "llama", "business", "certified", "certification", "developer", "platform", "api", "apis", "sdk"
+)
+# A Tier 1 name right after one of these words is something the candidate used or worked on, not their employer
+TOOL_CONTEXT_WORDS = ("with", "using", "on", "via", "for", "through", "into", "from", "in")
+MAX_EMPLOYER_LINE_WORDS = 12  # Longer dated lines are sentences, not role/employer lines
+REQUIRED_MONTHS = 24  # At least 2 years of experience
+PASS_MARGIN_MONTHS = 12  # A local pass needs REQUIRED_MONTHS + margin of dated experience
+FAIL_MARGIN_MONTHS = 12  # A local fail on experience needs less than REQUIRED_MONTHS - margin
+
+PASS = "pass"
+FAIL = "fail"
+
+MONTHS = {"jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+          "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12}
+MONTH_NAME = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?"
+DATE = rf"(?:{MONTH_NAME}\s*[',’]?\s*(?:\d{{4}}|\d{{2}})|\d{{1,2}}/\d{{4}}|\d{{4}})"
+DATE_RANGE_PATTERN = re.compile(
+    rf"(?P<start>{DATE})\s*(?:-|–|—|to|till|until)\s*(?P<end>{DATE}|present|current|now|ongoing|till date|date)",
+    re.IGNORECASE
+)
+YEARS_CLAIM_PATTERN = re.compile(r"(\d{1,2})\+?\s*(?:years|yrs)", re.IGNORECASE)
+COMPANY_PATTERNS = {
+    name: re.compile(r"\b(" + "|".join(aliases) + r")\b", re.IGNORECASE)
+    for name, aliases in TIER1_COMPANIES.items()
+}
+EMPLOYER_PATTERNS = {
+    name: re.compile(
+        "".join(rf"(?<!\b{word} )" for word in TOOL_CONTEXT_WORDS)
+        + r"(?<![\w-])(" + "|".join(aliases) + r")(?![\w-])"
+        + r"(?!\s+(?:" + "|".join(PRODUCT_WORDS) + r")\b)",
+        re.IGNORECASE
+    )
+    for name, aliases in EMPLOYER_ALIASES.items()
+}
+BULLET_LINE_PATTERN = re.compile(r"^\s*[-*–—>]")
+
+def _parse_date(text, is_end):
+    """Return (year, month) for a date token; bare years cover the whole year."""
+    text = text.lower().strip()
+    if text in ("present", "current", "now", "ongoing", "till date", "date"):
+        today = datetime.date.today()
+        return today.year, today.month
+    month_match = re.match(r"([a-z]{3})", text)
+    year_match = re.search(r"(\d{4}|\d{2})$", text)
+    if month_match and year_match:
+        year = int(year_match.group(1))
+        return (year + 2000 if year < 100 else year), MONTHS[month_match.group(1)]
+    if "/" in text:
+        month, year = text.split("/")
+        return int(year), min(max(int(month), 1), 12)
+    return int(text), 12 if is_end else 1
+
+def extract_date_ranges(text):
+    """Return (start_index, end_index) month indexes for every date range in text."""
+    ranges = []
+    for match in DATE_RANGE_PATTERN.finditer(text):
+        start_year, start_month = _parse_date(match.group("start"), is_end=False)
+        end_year, end_month = _parse_date(match.group("end"), is_end=True)
+        start, end = start_year * 12 + start_month, end_year * 12 + end_month
+        if 1950 * 12 < start <= end:
+            ranges.append((start, end))
+    return ranges
+
+def total_months(ranges, inclusive):
+    """Months covered by the union of ranges, so overlapping roles are not double counted."""
+    total = 0
+    current_start = current_end = None
+    for start, end in sorted(ranges):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start + (1 if inclusive else 0)
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start + (1 if inclusive else 0)
+    return total
+
+def find_employers(text):
+    """Return the Tier 1 company names mentioned in text."""
+    return sorted(name for name, pattern in COMPANY_PATTERNS.items() if pattern.search(text))
+
+def find_role_employers(line):
+    """
+    Return the Tier 1 companies a role/employer line of the experience section
+    names as the employer: a short, dated line that is not a bullet point,
+    naming the company rather than one of its products.
+    """
+    if BULLET_LINE_PATTERN.match(line) or len(line.split()) > MAX_EMPLOYER_LINE_WORDS or not DATE_RANGE_PATTERN.search(line):
+        return []
+    return sorted(name for name, pattern in EMPLOYER_PATTERNS.items() if pattern.search(line))
+
+def prescreen_resume(resume_text):
+    """
+    Decide the qualifying criteria locally when the answer is clear.
+    Returns (PASS or FAIL, explanation), or (None, explanation) when the
+    resume is ambiguous and should go to GPT.
+    """
+    text = compact_resume_text(resume_text)
+    mentioned = find_employers(text)
+    if not mentioned:
+        return FAIL, "No Tier 1 company (Google, Amazon, Microsoft, Meta, Apple) or subsidiary is mentioned anywhere in the resume."
+
+    experience_lines = [
+        line for name, body in split_sections(text) if name == "experience" for line in body.splitlines()
+    ]
+    experience_text = "\n".join(experience_lines)
+    ranges = extract_date_ranges(experience_text)
+    claimed_years = max((int(years) for years in YEARS_CLAIM_PATTERN.findall(text)), default=0)
+    months_low = total_months(ranges, inclusive=False)
+    months_high = total_months(ranges, inclusive=True)
+
+    if ranges and months_high < REQUIRED_MONTHS - FAIL_MARGIN_MONTHS and claimed_years * 12 < REQUIRED_MONTHS:
+        return FAIL, f"Only about {months_high} months of dated experience found (at least {REQUIRED_MONTHS} required)."
+
+    # Only a Tier 1 employer on a dated role line passes locally; any other mention goes to GPT
+    employers = set()
+    for line in experience_lines:
+        employers.update(find_role_employers(line))
+    if employers and months_low >= REQUIRED_MONTHS + PASS_MARGIN_MONTHS:
+        return PASS, (
+            f"Worked at {', '.join(sorted(employers))} with about {months_low // 12} years "
+            f"of dated experience."
+        )
+
+    return None, f"Mentions {', '.join(mentioned)}; about {months_low} months of dated experience found."
+
+class PrescreenStats:
+    """Thread-safe counters for pre-screen decisions and sampled agreement with GPT."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.decisions = {PASS: 0, FAIL: 0, "ambiguous": 0}
+        self.audited = 0
+        self.agreed = 0
+
+    def record(self, decision):
+        with self._lock:
+            self.decisions[decision or "ambiguous"] += 1
+
+    def record_audit(self, agreed):
+        with self._lock:
+            self.audited += 1
+            self.agreed += int(agreed)
+
+    def report(self):
+        with self._lock:
+            total = sum(self.decisions.values())
+            short_circuited = self.decisions[PASS] + self.decisions[FAIL]
+            return {
+                "resumes": total,
+                "decided_locally": dict(self.decisions),
+                "short_circuit_rate": short_circuited / total if total else 0.0,
+                "audited": self.audited,
+                "agreement_rate": self.agreed / self.audited if self.audited else None
+            }
@@ -0,0 +1,85 @@
+import heapq
+import itertools
+import re
+import threading
+
+# Ranking Configuration
+MAX_SCORE = 10  # Highest score a single criterion can get
+
+SCORE_PATTERN = re.compile(r"Score:\**\s*(\d+(?:\.\d+)?)", re.IGNORECASE)
+
+def parse_score(evaluation):
+    """Score from an evaluation text (its last "Score: 7" line), or None if it has none."""
+    matches = SCORE_PATTERN.findall(evaluation or "")
+    if not matches:
+        return None
+    return min(float(matches[-1]), MAX_SCORE)
+
+def criteria_by_weight(criteria_weights):
+    """Criteria ordered from highest to lowest weight (ties keep their order)."""
+    return sorted(criteria_weights, key=lambda criterion: -criteria_weights[criterion])
+
+def upper_bound(scores, criteria_weights):
+    """Best weighted total still possible: known scores plus MAX_SCORE for every unscored criterion."""
+    return sum(
+        weight * (scores[criterion] if criterion in scores else MAX_SCORE)
+        for criterion, weight in criteria_weights.items()
+    )
+
+class Leaderboard:
+    """Thread-safe streaming top-K of candidates by weighted total score."""
+
+    def __init__(self, top_k):
+        self.top_k = top_k
+        self._heap = []  # Min-heap of (total, order, entry); the root is the weakest of the current top K
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self.candidates = 0
+        self.pruned = 0
+        self.skipped_evaluations = 0
+
+    def threshold(self):
+        """Total a new candidate has to beat to enter the top K, or None while there are fewer than K."""
+        with self._lock:
+            return self._heap[0][0] if len(self._heap) >= self.top_k else None
+
+    def can_enter(self, best_possible_total):
+        """False when a candidate whose total is at most best_possible_total cannot reach the top K."""
+        threshold = self.threshold()
+        # Ties keep the candidates already on the board, so equalling the threshold is not enough
+        return threshold is None or best_possible_total > threshold
+
+    def offer(self, resume_key, total, scores):
+        """Add a fully scored candidate; returns True if it is now in the top K."""
+        entry = {"resume_key": resume_key, "weighted_score": total, "scores": scores}
+        with self._lock:
+            # Negated order so that, at equal totals, the earlier candidate ranks higher and stays
+            item = (total, -next(self._order), entry)
+            if len(self._heap) < self.top_k:
+                heapq.heappush(self._heap, item)
+                return True
+            if item > self._heap[0]:
+                heapq.heapreplace(self._heap, item)
+                return True
+            return False
+
+    def record(self, skipped_evaluations):
+        """Count a ranked candidate and the criterion evaluations pruned for it."""
+        with self._lock:
+            self.candidates += 1
+            self.pruned += int(skipped_evaluations > 0)
+            self.skipped_evaluations += skipped_evaluations
+
+    def report(self):
+        with self._lock:
+            return {
+                "top_k": self.top_k,
+                "candidates": self.candidates,
+                "pruned_candidates": self.pruned,
+                "skipped_evaluations": self.skipped_evaluations
+            }
+
+    def top(self):
+        """Current top K, best first."""
+        with self._lock:
+            return [entry for _, _, entry in sorted(self._heap, reverse=True)]
@@ -0,0 +1,332 @@
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:  # No flock on Windows; the buckets are then shared between threads only
+    fcntl = None
+import metrics
+from preprocess import estimate_tokens
+
+# Logging Configuration
+logger = logging.getLogger(__name__)
+
+# Rate Limit Configuration (starting values for each model; replaced by the limits the API reports for it)
+REQUESTS_PER_MINUTE = 500
+TOKENS_PER_MINUTE = 30000
+COMPLETION_TOKEN_ESTIMATE = 400  # Reserved for the reply when a request sets no max_tokens
+INITIAL_CONCURRENCY = 4  # GPT calls in flight per process before the limit adapts
+MAX_CONCURRENCY_LIMIT = 32
+MAX_RATE_LIMIT_RETRIES = 6  # Attempts after a 429 or a transient API error before giving up
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+LATENCY_SPIKE_FACTOR = 3.0  # A call this many times slower than the running average counts as congestion
+HEADROOM_FRACTION = 0.2  # Concurrency only grows while this share of both budgets is left
+STATE_PATH = "./cache/ratelimit.json"  # Shared by every process on the host; None keeps the buckets in memory
+
+DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+def parse_duration(value):
+    """Seconds in a rate-limit reset header such as "20ms", "1s" or "6m0s" (None if unparseable)."""
+    parts = DURATION_PATTERN.findall(value or "")
+    if not parts:
+        return None
+    return sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+
+def retry_after_seconds(headers):
+    """Delay the API asked for in a 429 response, if any."""
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    resets = [parse_duration(headers.get(name)) for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+    resets = [seconds for seconds in resets if seconds is not None]
+    return max(resets) if resets else None
+
+def estimate_request_tokens(request):
+    """Tokens a chat completion request is expected to use, prompt and reply together."""
+    prompt_tokens = sum(estimate_tokens(message["content"]) + 4 for message in request["messages"])
+    return prompt_tokens + (request.get("max_tokens") or COMPLETION_TOKEN_ESTIMATE)
+
+class SharedBuckets:
+    """
+    Request and token buckets for each model (the API limits every model
+    separately), refilled continuously at their per-minute limits. With a path
+    the state lives in a JSON file guarded by flock, so every process on the
+    host draws from the same budgets.
+    """
+
+    def __init__(self, path=None, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE):
+        self.path = path if fcntl else None
+        self._lock = threading.Lock()
+        self._default_limits = {"requests": requests_per_minute, "tokens": tokens_per_minute}
+        self._states = {}  # Model -> state; the last known state when the file is shared
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _new_state(requests_per_minute, tokens_per_minute):
+        return {
+            "limits": {"requests": requests_per_minute, "tokens": tokens_per_minute},
+            "levels": {"requests": requests_per_minute, "tokens": tokens_per_minute},
+            "updated_at": time.time(),
+            "paused_until": 0.0
+        }
+
+    def _initial_state(self, model):
+        """Fresh state for a model not in the shared file, starting from its last known limits."""
+        limits = self._states[model]["limits"] if model in self._states else self._default_limits
+        return self._new_state(limits["requests"], limits["tokens"])
+
+    @contextmanager
+    def _locked_state(self, model):
+        """Yield the model's refilled bucket state for read-modify-write under the thread and file locks."""
+        with self._lock:
+            if not self.path:
+                state = self._states.setdefault(model, self._initial_state(model))
+                self._refill(state)
+                yield state
+                return
+            with open(self.path, "a+") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    try:
+                        states = json.loads(f.read())["models"]
+                    except (json.JSONDecodeError, KeyError, TypeError):  # New, damaged or single-bucket file
+                        states = {}
+                    state = states.setdefault(model, self._initial_state(model))
+                    self._refill(state)
+                    yield state
+                    self._states[model] = state
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps({"models": states}))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _refill(state):
+        now = time.time()
+        elapsed = max(0.0, now - state["updated_at"])
+        for name, limit in state["limits"].items():
+            state["levels"][name] = min(limit, state["levels"][name] + elapsed * limit / 60)
+        state["updated_at"] = now
+
+    def try_acquire(self, model, tokens):
+        """Take one request and tokens from the model's buckets. Returns 0, or the seconds to wait before trying again."""
+        with self._locked_state(model) as state:
+            now = time.time()
+            if state["paused_until"] > now:
+                return state["paused_until"] - now
+            limits, levels = state["limits"], state["levels"]
+            tokens = min(tokens, limits["tokens"])  # A request larger than the whole budget waits for a full bucket
+            shortfall = max(
+                (1 - levels["requests"]) * 60 / limits["requests"],
+                (tokens - levels["tokens"]) * 60 / limits["tokens"]
+            )
+            if shortfall > 0:
+                return shortfall
+            levels["requests"] -= 1
+            levels["tokens"] -= tokens
+            return 0.0
+
+    def adjust_tokens(self, model, tokens):
+        """Return (negative) or charge (positive) the difference between estimated and actual usage."""
+        with self._locked_state(model) as state:
+            state["levels"]["tokens"] -= tokens
+
+    def update_from_headers(self, model, headers):
+        """Adopt the limits and remaining budget reported in x-ratelimit-* headers of a response for model."""
+        values = {}
+        for kind in ("limit", "remaining"):
+            for name in ("requests", "tokens"):
+                try:
+                    values[kind, name] = float(headers[f"x-ratelimit-{kind}-{name}"])
+                except (KeyError, TypeError, ValueError):
+                    pass
+        if not values:
+            return
+        with self._locked_state(model) as state:
+            for name in ("requests", "tokens"):
+                if values.get(("limit", name)):
+                    # A changed limit moves the level by the same amount, so a low starting guess is not a drag
+                    state["levels"][name] += values["limit", name] - state["limits"][name]
+                    state["limits"][name] = values["limit", name]
+                if ("remaining", name) in values:
+                    state["levels"][name] = min(state["levels"][name], values["remaining", name])
+
+    def pause(self, model, seconds):
+        """Stop all callers, in every process, from starting requests to model for seconds."""
+        with self._locked_state(model) as state:
+            state["paused_until"] = max(state["paused_until"], time.time() + seconds)
+
+    def headroom(self, model):
+        """Smallest remaining share of the model's request and token budgets."""
+        with self._locked_state(model) as state:
+            return min(state["levels"][name] / state["limits"][name] for name in state["limits"])
+
+    def limits(self):
+        """Last known per-minute limits of every model used so far."""
+        with self._lock:
+            return {model: dict(state["limits"]) for model, state in self._states.items()}
+
+class AdaptiveConcurrency:
+    """
+    Limit on GPT calls in flight in this process, adjusted AIMD-style: it grows
+    by about one per round of successful calls while there is headroom and is
+    halved on a 429 (cut by a quarter on a latency spike).
+    """
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, maximum=MAX_CONCURRENCY_LIMIT):
+        self.limit = float(initial)
+        self.maximum = maximum
+        self.in_flight = 0
+        self.latency_average = None
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify()
+
+    def _decrease(self, factor):
+        # At most one cut per average call duration, so a burst of 429s from one overload counts once
+        now = time.monotonic()
+        if now - self._last_decrease < (self.latency_average or 1.0):
+            return
+        self._last_decrease = now
+        self.limit = max(1.0, self.limit * factor)
+        logger.info(f"GPT concurrency limit lowered to {int(self.limit)}")
+
+    def on_success(self, latency, headroom):
+        with self._condition:
+            if self.latency_average is not None and latency > LATENCY_SPIKE_FACTOR * self.latency_average:
+                self._decrease(0.75)
+            elif headroom >= HEADROOM_FRACTION:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self._condition.notify_all()
+            self.latency_average = latency if self.latency_average is None else 0.9 * self.latency_average + 0.1 * latency
+
+    def on_throttled(self):
+        with self._condition:
+            self._decrease(0.5)
+
+class RateLimiter:
+    """Budgets GPT calls by requests and tokens and adapts how many run at once."""
+
+    def __init__(self, state_path=STATE_PATH):
+        self.buckets = SharedBuckets(state_path)
+        self.concurrency = AdaptiveConcurrency()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+        self.retries = 0
+        self.wait_seconds = 0.0
+
+    def _wait_for_budget(self, model, tokens):
+        started = time.monotonic()
+        with metrics.stage("rate_limit_wait"):
+            while True:
+                wait = self.buckets.try_acquire(model, tokens)
+                if wait <= 0:
+                    break
+                time.sleep(min(wait, BACKOFF_MAX_SECONDS) + random.uniform(0, 0.05))
+        with self._lock:
+            self.wait_seconds += time.monotonic() - started
+
+    def create_chat_completion(self, client, request):
+        """
+        client.chat.completions.create(**request) within the shared budget.
+        429s and transient API errors are retried here, with backoff, instead
+        of by the client, so that every 429 also slows down the other callers.
+        """
+        import openai
+
+        model = request["model"]
+        estimated_tokens = estimate_request_tokens(request)
+        raw_client = client.with_options(max_retries=0).chat.completions.with_raw_response
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            self._wait_for_budget(model, estimated_tokens)
+            delay = None
+            with self.concurrency.slot():
+                started = time.monotonic()
+                try:
+                    raw_response = raw_client.create(**request)
+                except openai.RateLimitError as e:
+                    if e.code == "insufficient_quota":  # Out of credit, not throttled; retrying cannot help
+                        raise
+                    self.concurrency.on_throttled()
+                    self.buckets.update_from_headers(model, e.response.headers)
+                    delay = retry_after_seconds(e.response.headers)
+                    with self._lock:
+                        self.throttled += 1
+                    error = e
+                except (openai.APIConnectionError, openai.InternalServerError) as e:
+                    error = e
+                else:
+                    latency = time.monotonic() - started
+                    response = raw_response.parse()
+                    self.buckets.update_from_headers(model, raw_response.headers)
+                    usage = getattr(response, "usage", None)
+                    if usage is not None:
+                        self.buckets.adjust_tokens(model, usage.total_tokens - estimated_tokens)
+                    self.concurrency.on_success(latency, self.buckets.headroom(model))
+                    with self._lock:
+                        self.calls += 1
+                    return response
+
+            if attempt == MAX_RATE_LIMIT_RETRIES:
+                break
+            backoff = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+            delay = max(delay or 0.0, backoff)
+            if isinstance(error, openai.RateLimitError):
+                self.buckets.pause(model, delay)
+            logger.warning(f"GPT call failed ({type(error).__name__}); retrying in {delay:.1f}s")
+            with self._lock:
+                self.retries += 1
+            time.sleep(delay)
+        raise error
+
+    def report(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "concurrency_limit": int(self.concurrency.limit),
+                "model_limits": self.buckets.limits()
+            }
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter():
+    """Return the shared rate limiter, creating it (and its state file) on first use."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(STATE_PATH)
+        return _limiter
@@ -0,0 +1,118 @@
+import argparse
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+import gpt
+import metrics
+import transport
+from preprocess import compact_resume_text, split_sections
+
+# Logging Configuration
+logger = logging.getLogger(__name__)
+
+def load_results(path):
+    """Results from a results.json list or a results.jsonl file."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+def save_results(path, results):
+    """Write results in the format path's extension implies, replacing the file only once it is complete."""
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        else:
+            json.dump(results, f, indent=2)
+    os.replace(temporary_path, path)
+
+def plan_reevaluation(result):
+    """
+    (stale, removed) criteria of a result: registered criteria whose version
+    differs from the one recorded in the result (all of them for results from
+    before versions were recorded), and evaluated criteria that are no longer
+    registered. Only qualified results with their resume text are re-evaluated,
+    and candidates pruned in ranking mode are left as they are.
+    """
+    if result.get("status") != "Qualified" or "resume_text" not in result or result.get("ranking", {}).get("pruned"):
+        return [], []
+    evaluations = result.get("evaluations", {})
+    stale = gpt.criteria_registry.stale_criteria(result.get("criteria_versions", {}))
+    removed = [criterion for criterion in evaluations if criterion not in gpt.criteria_registry]
+    return stale, removed
+
+def reevaluate_result(result, stale, removed):
+    """Evaluate the stale criteria of one result again and drop the removed ones, in place."""
+    resume_text = result["resume_text"]
+    sections = split_sections(compact_resume_text(resume_text)) if gpt.PREPROCESS_ENABLED else None
+    criteria_weights = {criterion: weight for criterion, weight in gpt.get_criteria_weights().items() if criterion in stale}
+    with metrics.track_resume():
+        evaluations = gpt.evaluate_criteria(resume_text, sections, criteria_weights)
+
+    result["evaluations"] = {
+        criterion: evaluation for criterion, evaluation in {**result.get("evaluations", {}), **evaluations}.items()
+        if criterion not in removed
+    }
+    result["criteria_versions"] = gpt.criteria_registry.versions(result["evaluations"])
+    # Weighted scores and top-K membership were computed with the old evaluations
+    result.pop("ranking", None)
+
+def reevaluate_results(results, max_concurrency=gpt.MAX_CONCURRENCY, dry_run=False):
+    """
+    Bring results up to date with the current criteria, re-evaluating only the
+    (resume, criterion) pairs whose criterion version changed. Results are
+    updated in place; returns a summary of the work done.
+    """
+    plans = [(result, *plan_reevaluation(result)) for result in results]
+    pending = [(result, stale, removed) for result, stale, removed in plans if stale or removed]
+    total_pairs = sum(len(gpt.criteria_registry.weights()) for result in results if result.get("status") == "Qualified")
+    summary = {
+        "results": len(results),
+        "results_updated": len(pending),
+        "pairs_reevaluated": sum(len(stale) for _, stale, _ in pending),
+        "pairs_removed": sum(len(removed) for _, _, removed in pending),
+        "pairs_total": total_pairs,
+        "stale_criteria": sorted({criterion for _, stale, _ in pending for criterion in stale})
+    }
+    summary["share_of_full_rerun"] = round(summary["pairs_reevaluated"] / total_pairs, 3) if total_pairs else 0.0
+    if dry_run or not pending:
+        return summary
+
+    errors = {}
+
+    def run(item):
+        result, stale, removed = item
+        try:
+            reevaluate_result(result, stale, removed)
+        except Exception as e:
+            logger.error(f"Error re-evaluating {result.get('resume_key')}: {e}")
+            errors[result.get("resume_key")] = str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        list(executor.map(run, pending))
+    summary["errors"] = errors
+    summary["cost_usd"] = metrics.batch_metrics.report()["cost_usd"]
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-evaluate only the criteria that changed since an existing results file was produced.")
+    parser.add_argument("--results", default="results.json", help="results.json or results.jsonl to update")
+    parser.add_argument("--output", help="Write the updated results here instead of replacing --results")
+    parser.add_argument("--concurrency", type=int, default=gpt.MAX_CONCURRENCY)
+    parser.add_argument("--dry-run", action="store_true", help="Only report which (resume, criterion) pairs are stale")
+    args = parser.parse_args()
+
+    try:
+        results = load_results(args.results)
+        summary = reevaluate_results(results, args.concurrency, args.dry_run)
+        if not args.dry_run and (summary["results_updated"] or args.output):
+            save_results(args.output or args.results, results)
+        print(json.dumps(summary, indent=2))
+    finally:
+        transport.close_clients()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+import argparse
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import gpt
+import metrics
+import transport
+from extraction import shutdown_extraction_pool
+
+# Logging Configuration
+logger = logging.getLogger(__name__)
+
+# Service Configuration
+HOST = "127.0.0.1"
+PORT = 8080
+BUCKET_NAME = "hm-video-audio-bucket"
+WORKERS = gpt.MAX_CONCURRENCY  # Resumes scored at once, across all jobs
+QUEUE_SIZE = 64  # Listed resumes waiting for a worker; listing pauses while the queue is full
+MAX_FINISHED_JOBS = 50  # Oldest finished jobs (and their results) are forgotten beyond this
+KEEPALIVE_SECONDS = 15  # Comment line sent on an idle event stream so proxies keep it open
+
+# Job states
+QUEUED, RUNNING, COMPLETED, CANCELLED, FAILED = "queued", "running", "completed", "cancelled", "failed"
+FINISHED_STATES = (COMPLETED, CANCELLED, FAILED)
+
+class Job:
+    """One folder (or list of resume keys) to score, with its results in completion order."""
+
+    def __init__(self, job_id, bucket_name, folder_path=None, resume_keys=None):
+        self.job_id = job_id
+        self.bucket_name = bucket_name
+        self.folder_path = folder_path
+        self.resume_keys = resume_keys
+        self.state = QUEUED
+        self.error = None
+        self.listed = 0
+        self.listing_done = False
+        self.results = []
+        self.metrics = metrics.BatchMetrics()  # This job's latency, token and cost totals; forgotten with the job
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._condition = threading.Condition()
+
+    @property
+    def cancelled(self):
+        return self.state == CANCELLED
+
+    def _finish(self, state):
+        self.state = state
+        self.finished_at = time.time()
+        self._condition.notify_all()
+
+    def _maybe_complete(self):
+        if self.state == RUNNING and self.listing_done and len(self.results) == self.listed:
+            self._finish(COMPLETED)
+
+    def mark_listed(self):
+        with self._condition:
+            self.listed += 1
+            if self.state == QUEUED:
+                self.state = RUNNING
+                self.started_at = time.time()
+
+    def mark_listing_done(self, error=None):
+        with self._condition:
+            self.listing_done = True
+            if error is not None and self.state not in FINISHED_STATES:
+                self.error = error
+                self._finish(FAILED)
+            elif self.state == QUEUED:  # Nothing to score
+                self.started_at = time.time()
+                self.state = RUNNING
+            self._maybe_complete()
+
+    def add_result(self, result):
+        with self._condition:
+            self.results.append(result)
+            self._maybe_complete()
+            self._condition.notify_all()
+
+    def cancel(self):
+        """Stop scoring resumes not yet started; resumes already being scored still finish. Returns False if already finished."""
+        with self._condition:
+            if self.state in FINISHED_STATES:
+                return False
+            self._finish(CANCELLED)
+            return True
+
+    def wait_for_results(self, start, timeout):
+        """Results from index start on, waiting up to timeout seconds for one. Returns (results, finished)."""
+        with self._condition:
+            if len(self.results) <= start and self.state not in FINISHED_STATES:
+                self._condition.wait(timeout)
+            return self.results[start:], self.state in FINISHED_STATES
+
+    def status(self):
+        with self._condition:
+            statuses = {}
+            for result in self.results:
+                status = "Error" if "error" in result else result.get("status", "Error")
+                statuses[status] = statuses.get(status, 0) + 1
+            return {
+                "job_id": self.job_id,
+                "state": self.state,
+                "bucket": self.bucket_name,
+                "folder_path": self.folder_path,
+                "listed": self.listed,
+                "listing_done": self.listing_done,
+                "completed": len(self.results),
+                "statuses": statuses,
+                "metrics": self.metrics.report(),
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at
+            }
+
+class ScoringService:
+    """
+    Job queue in front of a fixed pool of worker threads running
+    gpt.process_resume(). Each job lists its resumes lazily into a shared
+    bounded queue, so workers are shared between jobs and a large folder never
+    has to be listed in full before the first results arrive.
+    """
+
+    def __init__(self, workers=WORKERS, queue_size=QUEUE_SIZE):
+        self._tasks = queue.Queue(maxsize=queue_size)
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._workers = [
+            threading.Thread(target=self._work, name=f"scoring-worker-{index}", daemon=True)
+            for index in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, bucket_name, folder_path=None, resume_keys=None):
+        """Queue a job for a folder or an explicit list of resume keys and return it."""
+        with self._lock:
+            job = Job(f"job-{next(self._ids)}-{int(time.time())}", bucket_name, folder_path, resume_keys)
+            self._jobs[job.job_id] = job
+            self._forget_old_jobs()
+        threading.Thread(target=self._list, args=(job,), name=f"lister-{job.job_id}", daemon=True).start()
+        logger.info(f"Submitted {job.job_id} for {bucket_name}/{folder_path or f'{len(resume_keys)} keys'}")
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _forget_old_jobs(self):
+        finished = [job for job in self._jobs.values() if job.state in FINISHED_STATES]
+        for job in sorted(finished, key=lambda job: job.finished_at)[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.job_id]
+
+    def _list(self, job):
+        """Feed the job's resume keys to the workers as the listing pages arrive."""
+        try:
+            keys = job.resume_keys if job.resume_keys is not None else gpt.iter_files_in_folder(job.bucket_name, job.folder_path)
+            for resume_key in keys:
+                if job.cancelled:
+                    break
+                job.mark_listed()
+                self._tasks.put((job, resume_key))
+            job.mark_listing_done()
+        except Exception as e:
+            logger.error(f"Error listing resumes for {job.job_id}: {e}")
+            job.mark_listing_done(str(e))
+
+    def _work(self):
+        while True:
+            job, resume_key = self._tasks.get()
+            try:
+                if job.state in FINISHED_STATES:  # Cancelled or failed while the resume was queued
+                    continue
+                # Per-job metrics, so the process-wide batch_metrics does not grow for as long as the service runs
+                with metrics.track_batch(job.metrics):
+                    result = gpt.process_resume(job.bucket_name, resume_key)
+                job.add_result(result)
+            except Exception as e:
+                logger.error(f"Error processing resume {resume_key}: {e}")
+                job.add_result({"resume_key": resume_key, "error": str(e)})
+            finally:
+                self._tasks.task_done()
+
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON API of the scoring service:
+      POST   /jobs                {"folder_path": ...} or {"resume_keys": [...]}, optional "bucket"
+      GET    /jobs                status of every known job
+      GET    /jobs/<id>           job status
+      GET    /jobs/<id>/results   results so far (?offset=N skips the first N)
+      GET    /jobs/<id>/events    results as server-sent events while the job runs (resumes after Last-Event-ID)
+      DELETE /jobs/<id>           cancel the job
+    """
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status, body):
+        data = json.dumps(body, indent=2).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self):
+        """(job or None, sub-resource, query) for a /jobs path; job is None for /jobs itself."""
+        url = urllib.parse.urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = urllib.parse.parse_qs(url.query)
+        if not parts or parts[0] != "jobs" or len(parts) > 3:
+            return False, None, None, query
+        if len(parts) == 1:
+            return True, None, None, query
+        return True, self.server.service.get(parts[1]), (parts[2] if len(parts) == 3 else ""), query
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+            return
+        found, job, resource, query = self._route()
+        if not found:
+            self._send_json(404, {"error": "Not found"})
+        elif resource is None:
+            self._send_json(200, {"jobs": [job.status() for job in self.server.service.jobs()]})
+        elif job is None:
+            self._send_json(404, {"error": "Unknown job"})
+        elif resource == "":
+            self._send_json(200, job.status())
+        elif resource not in ("results", "events"):
+            self._send_json(404, {"error": "Not found"})
+        else:
+            offset = self._start_offset(query, resource == "events")
+            if offset is None:
+                self._send_json(400, {"error": "offset and Last-Event-ID must be non-negative integers."})
+            elif resource == "results":
+                results, _ = job.wait_for_results(offset, 0)
+                self._send_json(200, {**job.status(), "offset": offset, "results": results})
+            else:
+                self._stream_events(job, offset)
+
+    def _start_offset(self, query, resuming_events):
+        """
+        Index of the first result to send: ?offset=N, or for an event stream the
+        result after the client's Last-Event-ID. None when not a non-negative integer.
+        """
+        last_event_id = self.headers.get("Last-Event-ID") if resuming_events else None
+        try:
+            offset = int(last_event_id) + 1 if last_event_id else int(query.get("offset", ["0"])[0])
+        except ValueError:
+            return None
+        return offset if offset >= 0 else None
+
+    def _stream_events(self, job, offset):
+        """Send each result as a "result" event (id = its index) as soon as it is ready, then an "end" event."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while True:
+                results, finished = job.wait_for_results(offset, KEEPALIVE_SECONDS)
+                for result in results:
+                    self.wfile.write(f"id: {offset}\nevent: result\ndata: {json.dumps(result)}\n\n".encode())
+                    offset += 1
+                if finished:
+                    # Results added between the wait and the state check are sent before the end event
+                    results, _ = job.wait_for_results(offset, 0)
+                    for result in results:
+                        self.wfile.write(f"id: {offset}\nevent: result\ndata: {json.dumps(result)}\n\n".encode())
+                        offset += 1
+                    self.wfile.write(f"event: end\ndata: {json.dumps(job.status())}\n\n".encode())
+                    self.wfile.flush()
+                    return
+                if not results:
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            logger.info(f"Event stream for {job.job_id} closed by the client")
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            self._send_json(404, {"error": "Not found"})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": "Request body must be JSON."})
+            return
+        error = self._invalid_job_body(body)
+        if error:
+            self._send_json(400, {"error": error})
+            return
+        folder_path = body.get("folder_path")
+        resume_keys = body.get("resume_keys")
+        if folder_path:
+            folder_path = folder_path.replace("\\", "/")
+            resume_keys = None
+        job = self.server.service.submit(body.get("bucket") or self.server.bucket_name, folder_path, resume_keys)
+        self._send_json(202, job.status())
+
+    @staticmethod
+    def _invalid_job_body(body):
+        """Error message for a POST /jobs body with missing or wrongly typed fields, or None if it is valid."""
+        if not isinstance(body, dict):
+            return "Request body must be a JSON object."
+        for name in ("folder_path", "bucket"):
+            if body.get(name) is not None and not isinstance(body[name], str):
+                return f"{name} must be a string."
+        resume_keys = body.get("resume_keys")
+        if resume_keys is not None and not (isinstance(resume_keys, list) and all(isinstance(key, str) and key for key in resume_keys)):
+            return "resume_keys must be a list of non-empty strings."
+        if not body.get("folder_path") and not resume_keys:
+            return "No folder path or resume keys provided."
+        return None
+
+    def do_DELETE(self):
+        found, job, resource, _ = self._route()
+        if not found or resource != "":
+            self._send_json(404, {"error": "Not found"})
+        elif job is None:
+            self._send_json(404, {"error": "Unknown job"})
+        elif not job.cancel():
+            self._send_json(409, {"error": f"Job already {job.state}", **job.status()})
+        else:
+            self._send_json(200, job.status())
+
+    def log_message(self, format, *args):
+        logger.info(f"{self.address_string()} {format % args}")
+
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service, bucket_name=BUCKET_NAME):
+        super().__init__(address, ScoringRequestHandler)
+        self.service = service
+        self.bucket_name = bucket_name
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP service that scores S3 resume folders as background jobs and streams the results.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Resumes scored at once across all jobs")
+    parser.add_argument("--bucket", default=BUCKET_NAME, help="Bucket used when a job does not name one")
+    args = parser.parse_args()
+
+    transport.configure(pool_size=max(10, args.workers + 1))
+    server = ScoringServer((args.host, args.port), ScoringService(args.workers), args.bucket)
+    logger.info(f"Scoring service listening on http://{args.host}:{server.server_port} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        transport.close_clients()
+        shutdown_extraction_pool()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import contextvars
+import threading
+import time
+import metrics
+
+# Speculation modes
+OFF, ON, AUTO = "off", "on", "auto"
+
+class SpeculativeTask:
+    """
+    A call started before it is known whether its result is needed. It runs on
+    executor in a copy of the caller's contextvars context, so its GPT usage is
+    still counted for the caller's resume, and also tallied in spend. function
+    gets a threading.Event as its last argument and should stop early once set.
+    """
+
+    def __init__(self, executor, function, *args):
+        self.spend = metrics.Spend()
+        self.cancelled = threading.Event()
+        self.started_at = None
+        self.finished_at = None
+        self.future = executor.submit(contextvars.copy_context().run, self._run, function, args)
+
+    def _run(self, function, args):
+        self.started_at = time.perf_counter()
+        try:
+            with metrics.track_spend(self.spend):
+                return function(*args, self.cancelled)
+        finally:
+            self.finished_at = time.perf_counter()
+
+    def result(self):
+        """Wait for the result. Returns (result, seconds it ran before it was needed)."""
+        needed_at = time.perf_counter()
+        result = self.future.result()
+        return result, max(0.0, min(needed_at, self.finished_at) - self.started_at)
+
+    def discard(self, on_stopped):
+        """Cancel the call, or ask it to stop; on_stopped(spend) is called once it can spend no more."""
+        self.cancelled.set()
+        if self.future.cancel():
+            on_stopped(self.spend)
+        else:
+            self.future.add_done_callback(lambda _: on_stopped(self.spend))
+
+class SpeculationPolicy:
+    """
+    Thread-safe record of GPT qualification outcomes, used to decide whether to
+    evaluate criteria while qualification is still pending, and of what
+    speculation saved (seconds) and wasted (calls and cost of discarded evaluations).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.qualified = 0
+        self.speculated = 0
+        self.used = 0
+        self.discarded = 0
+        self.wasted_calls = 0
+        self.wasted_cost_usd = 0.0
+        self.saved_seconds = 0.0
+
+    def should_speculate(self, mode, min_qualify_rate, min_samples):
+        """True in ON mode, and in AUTO mode once min_samples checks show a qualification rate of at least min_qualify_rate."""
+        if mode == ON:
+            return True
+        if mode != AUTO:
+            return False
+        with self._lock:
+            return self.checks >= min_samples and self.qualified / self.checks >= min_qualify_rate
+
+    def record_qualification(self, qualified):
+        with self._lock:
+            self.checks += 1
+            self.qualified += int(qualified)
+
+    def record_started(self):
+        with self._lock:
+            self.speculated += 1
+
+    def record_used(self, saved_seconds):
+        with self._lock:
+            self.used += 1
+            self.saved_seconds += saved_seconds
+
+    def record_discarded(self, spend):
+        with self._lock:
+            self.discarded += 1
+            self.wasted_calls += spend.calls
+            self.wasted_cost_usd += spend.cost_usd
+
+    def report(self):
+        with self._lock:
+            return {
+                "qualification_checks": self.checks,
+                "qualification_rate": round(self.qualified / self.checks, 3) if self.checks else None,
+                "speculated": self.speculated,
+                "used": self.used,
+                "discarded": self.discarded,
+                "wasted_calls": self.wasted_calls,
+                "wasted_cost_usd": round(self.wasted_cost_usd, 6),
+                "saved_seconds": round(self.saved_seconds, 3)
+            }
@@ -0,0 +1,29 @@
+import math
+from types import SimpleNamespace
+import pytest
+from cascade import answer_confidence, first_line_answers
+
+def response_with_logprobs(tokens):
+    """Chat completion stand-in whose reply is tokens, given as (token, probability) pairs."""
+    logprobs = SimpleNamespace(content=[SimpleNamespace(token=token, logprob=math.log(p)) for token, p in tokens])
+    content = "".join(token for token, _ in tokens)
+    return SimpleNamespace(choices=[SimpleNamespace(logprobs=logprobs, message=SimpleNamespace(content=content))])
+
+@pytest.mark.parametrize("reply, answers", [
+    ("YES\nWorked at Google for 3 years.", {"YES"}),
+    ("No. Less than two years of experience.", {"NO"}),
+    ("I cannot determine this from the resume.\nYes", set()),
+    ("NONE of the companies are known Tier 1 employers", set()),
+    ("Not enough information", set()),
+    ("Yes and no", {"YES", "NO"})
+])
+def test_first_line_answers(reply, answers):
+    assert first_line_answers(reply) == answers
+
+def test_answer_confidence_reads_the_first_line_answer():
+    response = response_with_logprobs([("YES", 0.95), ("\n", 1.0), ("No", 0.3)])
+    assert answer_confidence(response) == pytest.approx(0.95)
+
+def test_answer_confidence_ignores_answers_after_the_first_line():
+    response = response_with_logprobs([("I", 1.0), (" cannot", 0.99), (" determine", 0.99), ("\n", 1.0), ("Yes", 0.99)])
+    assert answer_confidence(response) is None
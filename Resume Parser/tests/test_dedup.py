@@ -0,0 +1,36 @@
+import time
+from dedup import DuplicateIndex, minhash
+
+RESUME = "Experience\nSoftware Engineer, Google Jan 2018 - Present\n- Built search ranking features for the shopping team"
+
+def index_rows(index):
+    return [index._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ("documents", "bands")]
+
+def test_finds_a_near_duplicate_scored_in_the_same_context(tmp_path):
+    index = DuplicateIndex(str(tmp_path / "dedup.sqlite3"))
+    index.add("a.pdf", RESUME, minhash(RESUME), "context", {"status": "Qualified"})
+    duplicate = index.find("b.pdf", RESUME, minhash(RESUME), "context")
+    assert duplicate["resume_key"] == "a.pdf" and duplicate["result"] == {"status": "Qualified"}
+    assert index.find("b.pdf", RESUME, minhash(RESUME), "other context") is None
+    assert index.find("a.pdf", RESUME, minhash(RESUME), "context") is None
+
+def test_expired_resumes_are_not_matched_and_are_evicted(tmp_path):
+    index = DuplicateIndex(str(tmp_path / "dedup.sqlite3"), max_age_seconds=60)
+    index.add("a.pdf", RESUME, minhash(RESUME), "context", {"status": "Qualified"})
+    index._conn.execute("UPDATE documents SET created_at = ?", (time.time() - 120,))
+    assert index.find("b.pdf", RESUME, minhash(RESUME), "context") is None
+    other = RESUME.replace("shopping", "maps")
+    index.add("c.pdf", other, minhash(other), "context", {"status": "Qualified"})
+    assert index_rows(index) == [1, 32]
+
+def test_least_recently_matched_resume_is_evicted_over_the_size_limit(tmp_path):
+    index = DuplicateIndex(str(tmp_path / "dedup.sqlite3"))
+    texts = {key: f"{RESUME}\n- Project {key} shipped to every user" for key in ("a.pdf", "b.pdf", "c.pdf")}
+    index.add("a.pdf", texts["a.pdf"], minhash(texts["a.pdf"]), "context", {})
+    index.add("b.pdf", texts["b.pdf"], minhash(texts["b.pdf"]), "context", {})
+    index._conn.execute("UPDATE documents SET accessed_at = accessed_at - 10")
+    assert index.find("x.pdf", texts["a.pdf"], minhash(texts["a.pdf"]), "context")["resume_key"] == "a.pdf"
+    index.max_bytes = index._conn.execute("SELECT SUM(size) FROM documents").fetchone()[0]
+    index.add("c.pdf", texts["c.pdf"], minhash(texts["c.pdf"]), "context", {})
+    keys = {row[0] for row in index._conn.execute("SELECT resume_key FROM bands")}
+    assert {row[0] for row in index._conn.execute("SELECT resume_key FROM documents")} == keys == {"a.pdf", "c.pdf"}
@@ -0,0 +1,12 @@
+import metrics
+
+def test_track_batch_keeps_work_out_of_the_global_batch_metrics():
+    before = metrics.batch_metrics.report()["stages"].get("download", {}).get("count", 0)
+    job_metrics = metrics.BatchMetrics()
+    with metrics.track_batch(job_metrics):
+        with metrics.track_resume():
+            with metrics.stage("download"):
+                pass
+    assert job_metrics.report()["resumes"] == 1
+    assert job_metrics.report()["stages"]["download"]["count"] == 1
+    assert metrics.batch_metrics.report()["stages"].get("download", {}).get("count", 0) == before
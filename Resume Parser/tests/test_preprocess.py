@@ -0,0 +1,44 @@
+import pytest
+from preprocess import compact_resume_text
+
+@pytest.mark.parametrize("text, expected", [
+    ("Software Engineer, Google  2019 - 2021", "Software Engineer, Google 2019 - 2021"),
+    ("B.Tech 2018 - 2022  CGPA 8.5", "B.Tech 2018 - 2022 CGPA 8.5"),
+    ("Analyst, Thailand 01/2022  - 12/2022", "Analyst, Thailand 01/2022 - 12/2022"),
+    ("Intern, Mumbai Jan 2021 - Dec 2022", "Intern, Mumbai Jan 2021 - Dec 2022"),
+    ("Education\n2026\n2022\n2020", "Education\n2026\n2022\n2020"),
+    ("Years 2018-2019-2020-2021", "Years 2018-2019-2020-2021")
+])
+def test_dates_and_year_columns_are_kept(text, expected):
+    assert compact_resume_text(text) == expected
+
+@pytest.mark.parametrize("text, expected", [
+    ("Phone: +91 98765 43210", "Phone:"),
+    ("Phone: +91-9876543210 | Pune", "Phone: | Pune"),
+    ("Mobile 9876543210", "Mobile"),
+    ("Mobile 91-9876543210, +91- 9876543210", "Mobile"),
+    ("Call (US) +1 415-555-0132", "Call (US)"),
+    ("phone+91-9876543210", "phone"),
+    ("Tel 022 2576 4567 Mumbai", "Tel Mumbai")
+])
+def test_phone_numbers_are_removed(text, expected):
+    assert compact_resume_text(text) == expected
+
+def test_repeated_lines_in_the_body_are_kept():
+    text = (
+        "Experience\nSoftware Engineer\nInfosys 2015 - 2017\nBuilt billing services\nSkills: Python, SQL\n"
+        "Migrated the data warehouse\nLed the payments team\nSoftware Engineer\nTCS 2017 - 2020\nSkills: Python, SQL"
+    )
+    lines = compact_resume_text(text).splitlines()
+    assert lines.count("Software Engineer") == 2
+    assert lines.count("Skills: Python, SQL") == 2
+
+def test_running_headers_and_footers_are_dropped():
+    page = "Jane Doe - Resume\n{}\nBody line one\nBody line two\nBody line three\nBody line four\nBody line five\nConfidential"
+    text = "\f".join(page.format(f"Page content {number}") for number in (1, 2, 3))
+    lines = compact_resume_text(text).splitlines()
+    assert lines.count("Jane Doe - Resume") == 1
+    assert lines.count("Confidential") == 1
+    assert [line for line in lines if line.startswith("Page content")] == ["Page content 1", "Page content 2", "Page content 3"]
+    # Body lines repeated on every page, but away from the page edges, are kept
+    assert lines.count("Body line two") == 3
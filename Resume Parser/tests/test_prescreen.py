@@ -0,0 +1,40 @@
+import pytest
+from prescreen import FAIL, PASS, prescreen_resume
+
+@pytest.mark.parametrize("text", [
+    "Experience\nSoftware Engineer, Google Jan 2018 - Present\n- Built search ranking features",
+    "Experience\nSDE II | Amazon | 06/2017 - 08/2021\n- Owned the payments service"
+])
+def test_tier1_employer_on_role_line_passes(text):
+    assert prescreen_resume(text)[0] == PASS
+
+@pytest.mark.parametrize("text", [
+    "Experience\nBackend Engineer, Acme Startup Pvt Ltd Jan 2019 - Dec 2023\n- Deployed microservices on AWS Lambda and S3",
+    "Experience\nData Scientist, Infosys Jan 2018 - Present\nBuilt on-device models with Apple Core ML",
+    "Experience\nCloud Engineer, TCS Jan 2018 - Present\n- Migrated workloads to Google Cloud",
+    "Experience\nDevOps Engineer, Wipro Jan 2018 - Present\n- Managed Microsoft Azure subscriptions",
+    "Experience\nConsultant, Accenture 2017 - 2022\n- Rolled out Microsoft Teams to 5000 users",
+    "Experience\nResearch Engineer, Qualcomm Jan 2018 - Present\n- Published work on meta-learning",
+    "Experience\nML Engineer, Infosys (Google Cloud partner) Jan 2018 - Present",
+    "Experience\niOS Developer, Flipkart 2018 - 2023 working with Apple"
+])
+def test_tier1_products_and_tools_go_to_gpt(text):
+    assert prescreen_resume(text)[0] is None
+
+@pytest.mark.parametrize("text", [
+    "Experience\nIntern, Google Jun 2023 - Aug 2023",
+    "Experience\nSoftware Engineer, Infosys Jan 2018 - Present"
+])
+def test_clear_fails(text):
+    assert prescreen_resume(text)[0] == FAIL
+
+@pytest.mark.parametrize("text", [
+    "Experience\nResearch Scientist, DeepMind Jan 2016 - Present",
+    "Experience\nSoftware Engineer, YouTube 2015 - 2022",
+    "Experience\nAndroid Engineer, Instagram Jan 2017 - Present",
+    "Experience\nBackend Engineer, WhatsApp 2016 - 2021",
+    "Experience\nSenior Engineer, LinkedIn Jan 2015 - Present",
+    "Experience\nStaff Engineer, GitHub 2014 - 2020"
+])
+def test_tier1_subsidiaries_go_to_gpt(text):
+    assert prescreen_resume(text)[0] is None
@@ -0,0 +1,17 @@
+import pytest
+from ranking import parse_score, upper_bound
+
+@pytest.mark.parametrize("evaluation, score", [
+    ("### Score: 7\n\n### Justification:\nStrong backend work.", 7),
+    ("The candidate led two teams.\nScore: 8", 8),
+    ("A score of 9 was considered, but Score: 4 is fairer.\nScore: 6", 6),
+    ("**Score:** 12", 10),
+    ("Score: 0", 0),
+    ("The candidate is a strong fit overall.", None),
+    (None, None)
+])
+def test_parse_score(evaluation, score):
+    assert parse_score(evaluation) == score
+
+def test_upper_bound_counts_unscored_criteria_at_max_score():
+    assert upper_bound({"Experience": 5}, {"Experience": 2, "Education": 1}) == 20
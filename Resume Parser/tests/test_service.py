@@ -0,0 +1,37 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+import pytest
+import service
+
+@pytest.fixture
+def base_url():
+    server = service.ScoringServer(("127.0.0.1", 0), service.ScoringService(workers=1))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+def post_job(base_url, body):
+    request = urllib.request.Request(f"{base_url}/jobs", data=json.dumps(body).encode(), method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+@pytest.mark.parametrize("body", [
+    [],
+    {},
+    {"folder_path": 123},
+    {"folder_path": ["resumes/"]},
+    {"resume_keys": "resumes/a.pdf"},
+    {"resume_keys": ["resumes/a.pdf", 7]},
+    {"resume_keys": [""]},
+    {"folder_path": "resumes/", "bucket": 5}
+])
+def test_wrongly_typed_job_bodies_get_400(base_url, body):
+    status, response = post_job(base_url, body)
+    assert status == 400
+    assert "error" in response
@@ -0,0 +1,92 @@
+import logging
+import threading
+
+# Logging Configuration
+logger = logging.getLogger(__name__)
+
+# Transport Configuration
+POOL_SIZE = 10  # Keep-alive connections per client; set via configure() to match the pipeline concurrency
+CONNECT_TIMEOUT_SECONDS = 10
+READ_TIMEOUT_SECONDS = 120
+OPENAI_MAX_RETRIES = 2
+
+_settings = {
+    "openai_api_key": "",
+    "openai_base_url": None,  # None uses the public OpenAI endpoint
+    "aws_access_key_id": "",
+    "aws_secret_access_key": "",
+    "region_name": "",
+    "s3_endpoint_url": None  # None uses the regional AWS endpoint
+}
+_openai_client = None
+_s3_client = None
+_lock = threading.Lock()
+
+def configure(pool_size=None, **settings):
+    """
+    Set credentials and the connection-pool size used for the shared clients.
+    Must be called before the clients are first used; later calls only affect
+    clients created after close_clients().
+    """
+    global POOL_SIZE
+    unknown = set(settings) - set(_settings)
+    if unknown:
+        raise ValueError(f"Unknown transport settings: {sorted(unknown)}")
+    with _lock:
+        _settings.update(settings)
+        if pool_size is not None:
+            POOL_SIZE = pool_size
+
+def get_openai_client():
+    """Return the shared OpenAI client, which reuses keep-alive HTTPS connections across threads."""
+    global _openai_client
+    with _lock:
+        if _openai_client is None:
+            # Imported on first use so that importing the pipeline stays cheap on a Lambda cold start
+            import httpx
+            import openai
+            http_client = openai.DefaultHttpxClient(
+                limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+                timeout=httpx.Timeout(READ_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS)
+            )
+            _openai_client = openai.OpenAI(
+                api_key=_settings["openai_api_key"],
+                base_url=_settings["openai_base_url"],
+                http_client=http_client,
+                max_retries=OPENAI_MAX_RETRIES
+            )
+        return _openai_client
+
+def get_s3_client():
+    """Return the shared S3 client with a connection pool of POOL_SIZE."""
+    global _s3_client
+    with _lock:
+        if _s3_client is None:
+            import boto3
+            from botocore.config import Config
+            _s3_client = boto3.client(
+                "s3",
+                aws_access_key_id=_settings["aws_access_key_id"] or None,
+                aws_secret_access_key=_settings["aws_secret_access_key"] or None,
+                region_name=_settings["region_name"] or None,
+                endpoint_url=_settings["s3_endpoint_url"],
+                config=Config(
+                    max_pool_connections=POOL_SIZE,
+                    connect_timeout=CONNECT_TIMEOUT_SECONDS,
+                    read_timeout=READ_TIMEOUT_SECONDS,
+                    tcp_keepalive=True
+                )
+            )
+        return _s3_client
+
+def close_clients():
+    """Close pooled connections. Clients are recreated on next use."""
+    global _openai_client, _s3_client
+    with _lock:
+        if _openai_client is not None:
+            _openai_client.close()
+            _openai_client = None
+        if _s3_client is not None:
+            if hasattr(_s3_client, "close"):  # Older botocore clients have no close()
+                _s3_client.close()
+            _s3_client = None